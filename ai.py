@@ -1,18 +1,34 @@
 # ai.py
 import random
 import math
+import sys
 import time
 from functools import lru_cache
 from collections import deque
+from tables import MARK_VALUE, POW3, WINNER
+from ttable import EXACT, LOWER, UPPER
 
 # 使用lru_cache来缓存评估结果
 @lru_cache(maxsize=10000)
 def cached_evaluate(game_state):
     return game_state.evaluate()
 
+# 后台思考被叫停时用于中断搜索
+class SearchAborted(Exception):
+    pass
+
 # Minimax (深度限制搜索)
-def minimax_depth_limited(game, depth, maximizing_player, alpha=-float('inf'), beta=float('inf')):
+# pv 为列表时写入从本局面开始的主变例（最佳着法序列）
+def minimax_depth_limited(game, depth, maximizing_player, alpha=-float('inf'), beta=float('inf'), profiler=None, stop=None,
+                          pv=None):
+    if stop is not None and stop.is_set():
+        raise SearchAborted()
+    if profiler is not None:
+        # 按剩余深度统计节点数
+        profiler.visit(depth)
     if depth == 0 or game.is_terminal():
+        if profiler is not None:
+            profiler.count('evaluations')
         return cached_evaluate(game), None
 
     best_move = None
@@ -20,33 +36,156 @@ def minimax_depth_limited(game, depth, maximizing_player, alpha=-float('inf'), b
     if maximizing_player:
         max_eval = -float('inf')
         for move in valid_moves:
-            new_game = game.clone()
-            new_game.make_move(*move)
-            eval, _ = minimax_depth_limited(new_game, depth - 1, False, alpha, beta)
+            new_game = _play(game, move, profiler)
+            child_pv = [] if pv is not None else None
+            eval, _ = minimax_depth_limited(new_game, depth - 1, False, alpha, beta, profiler, stop, child_pv)
             if eval > max_eval:
                 max_eval = eval
                 best_move = move
+                if pv is not None:
+                    pv[:] = [move] + child_pv
             alpha = max(alpha, eval)
             if beta <= alpha:
+                if profiler is not None:
+                    profiler.count('cutoffs')
                 break
         return max_eval, best_move
     else:
         min_eval = float('inf')
         for move in valid_moves:
-            new_game = game.clone()
-            new_game.make_move(*move)
-            eval, _ = minimax_depth_limited(new_game, depth - 1, True, alpha, beta)
+            new_game = _play(game, move, profiler)
+            child_pv = [] if pv is not None else None
+            eval, _ = minimax_depth_limited(new_game, depth - 1, True, alpha, beta, profiler, stop, child_pv)
             if eval < min_eval:
                 min_eval = eval
                 best_move = move
+                if pv is not None:
+                    pv[:] = [move] + child_pv
             beta = min(beta, eval)
             if beta <= alpha:
+                if profiler is not None:
+                    profiler.count('cutoffs')
                 break
         return min_eval, best_move
 
+# Principal Variation Search：negamax 形式，分数以 color 一方（1 为 X，-1 为 O）为视角
+# 第一个子节点用完整窗口，其余用零窗口试探，只有 fail-high 时才重新搜索
+# 评估值都是整数，所以 (alpha, alpha + 1) 就是零窗口
+# tt 为 SharedTranspositionTable 时在进程和多次运行之间共享搜索结果
+# pv 与 minimax_depth_limited 相同；置换表截断的节点只能给出保存的那一步
+def pvs(game, depth, alpha, beta, color, profiler=None, stop=None, ordered=False, tt=None, pv=None):
+    if stop is not None and stop.is_set():
+        raise SearchAborted()
+    if profiler is not None:
+        profiler.visit(depth)
+    if depth == 0 or game.is_terminal():
+        if profiler is not None:
+            profiler.count('evaluations')
+        return color * cached_evaluate(game), None
+
+    # 置换表：深度足够时直接使用保存的分数或边界，否则只把保存的着法排到最前
+    tt_move = None
+    if tt is not None:
+        key = game.position_hash()
+        entry = tt.probe(key)
+        if profiler is not None:
+            profiler.count('tt_probes')
+        if entry is not None:
+            if profiler is not None:
+                profiler.count('tt_hits')
+            tt_depth, bound, tt_score, tt_move = entry
+            if tt_move is not None and game.boards[tt_move[0]][tt_move[1]] != ' ':
+                tt_move = None
+            if tt_depth >= depth and tt_move is not None:
+                if bound == EXACT or (bound == LOWER and tt_score >= beta) or (bound == UPPER and tt_score <= alpha):
+                    if profiler is not None:
+                        profiler.count('tt_cutoffs')
+                    if pv is not None:
+                        pv[:] = [tt_move]
+                    return tt_score, tt_move
+        alpha_orig = alpha
+
+    best_score = -float('inf')
+    best_move = None
+    first = True
+    moves = game.get_valid_moves()
+    if ordered:
+        moves = order_moves(game, moves)
+    if tt_move is not None and tt_move in moves:
+        moves.remove(tt_move)
+        moves.insert(0, tt_move)
+    for move in moves:
+        new_game = _play(game, move, profiler)
+        child_pv = [] if pv is not None else None
+        if first:
+            score = -pvs(new_game, depth - 1, -beta, -alpha, -color, profiler, stop, True, tt, child_pv)[0]
+            first = False
+        else:
+            score = -pvs(new_game, depth - 1, -alpha - 1, -alpha, -color, profiler, stop, True, tt, child_pv)[0]
+            if alpha < score < beta:
+                if profiler is not None:
+                    profiler.count('re_searches')
+                child_pv = [] if pv is not None else None
+                score = -pvs(new_game, depth - 1, -beta, -alpha, -color, profiler, stop, True, tt, child_pv)[0]
+        if score > best_score:
+            best_score = score
+            best_move = move
+            if pv is not None:
+                pv[:] = [move] + child_pv
+        if score > alpha:
+            alpha = score
+        if alpha >= beta:
+            if profiler is not None:
+                profiler.count('cutoffs')
+            break
+
+    if tt is not None:
+        if best_score <= alpha_orig:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        tt.store(key, depth, bound, best_score, best_move)
+    return best_score, best_move
+
+# 走法排序：能赢下小棋盘的优先，其次是能阻止对手赢下小棋盘的
+# 根节点保持原有顺序，这样与 minimax 在同样深度下选出的着法一致
+def order_moves(game, moves):
+    player = game.current_player
+    opponent = 'O' if player == 'X' else 'X'
+    own = MARK_VALUE[player]
+    other = MARK_VALUE[opponent]
+    codes = game.board_codes
+    captures = []
+    blocks = []
+    quiet = []
+    for move in moves:
+        code = codes[move[0]]
+        step = POW3[move[1]]
+        if WINNER[code + own * step] == player:
+            captures.append(move)
+        elif WINNER[code + other * step] == opponent:
+            blocks.append(move)
+        else:
+            quiet.append(move)
+    return captures + blocks + quiet
+
+# 复制棋局并落子，开启分析时统计 make_move 的耗时
+def _play(game, move, profiler=None):
+    new_game = game.clone()
+    if profiler is None:
+        new_game.make_move(*move)
+    else:
+        start = time.perf_counter()
+        new_game.make_move(*move)
+        profiler.add_time('make_move', time.perf_counter() - start)
+        profiler.count('make_move')
+    return new_game
+
 # Monte Carlo Tree Search
 class MCTSNode:
-    __slots__ = ('game', 'parent', 'move', 'children', 'visits', 'score', 'untried_moves')
+    __slots__ = ('game', 'parent', 'move', 'children', 'visits', 'score', 'untried_moves', 'proven', 'amaf')
 
     def __init__(self, game, parent=None, move=None):
         self.game = game
@@ -56,9 +195,23 @@ class MCTSNode:
         self.visits = 0
         self.score = 0
         self.untried_moves = game.get_valid_moves()
+        # MCTS-Solver 已证明的结果：'X'、'O' 或 'Draw'，未证明为 None
+        self.proven = game.winner if game.game_over else None
+        # RAVE/AMAF 统计：move -> [visits, score]
+        self.amaf = None
 
-    def select(self):
-        return max(self.children, key=lambda c: c.uct_value())
+    def select(self, solver=False, rave_k=0):
+        # 分数以 X 的视角累计，轮到 O 选择时取反
+        sign = 1 if self.game.current_player == 'X' else -1
+        children = self.children
+        if solver:
+            # 已证明的子树不再采样
+            children = [c for c in children if c.proven is None]
+        if rave_k:
+            log_n = math.log(self.visits)
+            amaf = self.amaf or {}
+            return max(children, key=lambda c: c.rave_value(sign, log_n, amaf.get(c.move), rave_k))
+        return max(children, key=lambda c: c.uct_value(sign=sign))
 
     def expand(self):
         move = self.untried_moves.pop()
@@ -68,11 +221,17 @@ class MCTSNode:
         self.children.append(child)
         return child
 
-    def simulate(self):
+    def simulate(self, profiler=None, played=None):
         game = self.game.clone()
+        length = 0
         while not game.is_terminal():
             move = random.choice(game.get_valid_moves())
+            if played is not None:
+                played.append((game.current_player, move))
             game.make_move(*move)
+            length += 1
+        if profiler is not None:
+            profiler.rollout(length)
         return cached_evaluate(game)
 
     def backpropagate(self, result):
@@ -81,22 +240,287 @@ class MCTSNode:
         if self.parent:
             self.parent.backpropagate(result)
 
-    def uct_value(self, c=1.41):
+    # 回传时同时更新 AMAF：本节点之后由同一方下过的格子都分享这次的结果
+    # 每个格子一局只会被下一次，所以不需要区分第一次出现
+    def backpropagate_rave(self, result, played):
+        node = self
+        while node is not None:
+            node.visits += 1
+            node.score += result
+            to_move = node.game.current_player
+            if node.amaf is None:
+                node.amaf = {}
+            amaf = node.amaf
+            for player, move in played:
+                if player == to_move:
+                    stats = amaf.get(move)
+                    if stats is None:
+                        amaf[move] = [1, result]
+                    else:
+                        stats[0] += 1
+                        stats[1] += result
+            if node.parent is not None:
+                played.append((node.parent.game.current_player, node.move))
+            node = node.parent
+
+    def uct_value(self, c=1.41, sign=1):
         if self.visits == 0:
             return float('inf')
-        return self.score / self.visits + c * math.sqrt(math.log(self.parent.visits) / self.visits)
+        return sign * self.score / self.visits + c * math.sqrt(math.log(self.parent.visits) / self.visits)
+
+    def rave_value(self, sign, log_n, stats, k, c=1.41):
+        if self.visits == 0:
+            return float('inf')
+        value = self.score / self.visits
+        if stats is not None:
+            beta = math.sqrt(k / (3 * self.visits + k))
+            value = (1 - beta) * value + beta * stats[1] / stats[0]
+        return sign * value + c * math.sqrt(log_n / self.visits)
+
+# 搜索树的节点预算：达到上限后回收访问最少的叶子（prune=True），或者停止扩展、只从现有叶子模拟
+# max_nodes 直接限制节点数，memory_limit 按字节限制，两者都给时取更严的一个
+class TreeBudget:
+    # 每次回收释放上限的这一比例，均摊下来每次扩展只需很少的回收开销
+    PRUNE_FRACTION = 0.25
+    # 估计每个节点字节数时抽样的节点数
+    SAMPLE_SIZE = 64
+
+    def __init__(self, max_nodes=None, memory_limit=None, prune=True):
+        # 根节点本身占一个名额，至少还要能扩展出一个子节点才有着法可选
+        if max_nodes is not None and max_nodes < 2:
+            raise ValueError(f"max_nodes must be at least 2, got {max_nodes}")
+        self.max_nodes = max_nodes
+        self.memory_limit = memory_limit
+        self.prune = prune
+        self.limit = None
+        self.nodes = 0
+        self.node_bytes = 0
+        self.pruned = 0
+        self._full = False
+        self._next_measure = 0
+        # 抽样用独立的随机数发生器，不影响按种子复现的对局
+        self._rng = random.Random(0)
 
-def mcts(game, iterations=100, time_limit=1):
+    # 每次搜索开始时重新数一遍节点，复用的子树也计入预算；pruned 为本次搜索回收的节点数
+    def start(self, root):
+        self.pruned = 0
+        self._full = False
+        self._measure(root)
+
+    # 遍历整棵树：更新节点数，并用随机抽取的非根节点重新估计每个节点的字节数
+    # 根节点的 untried_moves 最长，不能代表一般节点；树里只有根时用根的一个子局面作样本
+    def _measure(self, root):
+        nodes = [root]
+        stack = [root]
+        while stack:
+            children = stack.pop().children
+            nodes.extend(children)
+            stack.extend(children)
+        self.nodes = len(nodes)
+        # RAVE 的 AMAF 表随访问增长，所以树每长大一倍就重新估计
+        self._next_measure = max(2 * self.nodes, 64)
+        sample = nodes[1:]
+        if len(sample) > self.SAMPLE_SIZE:
+            sample = self._rng.sample(sample, self.SAMPLE_SIZE)
+        if not sample and root.untried_moves:
+            game = root.game.clone()
+            game.make_move(*root.untried_moves[-1])
+            sample = [MCTSNode(game, root)]
+        sample = sample or [root]
+        self.node_bytes = sum(node_bytes(node) for node in sample) // len(sample)
+        limits = [self.max_nodes] if self.max_nodes is not None else []
+        if self.memory_limit is not None:
+            limits.append(self.memory_limit // self.node_bytes)
+        # 内存上限小于两个节点时仍允许根节点扩展一个子节点
+        self.limit = max(min(limits), 2) if limits else float('inf')
+        return nodes
+
+    # 搜索结束时重新估计，报告的字节数反映长成的树
+    def finish(self, root):
+        self._measure(root)
+
+    @property
+    def bytes(self):
+        return self.nodes * self.node_bytes
+
+    # 为即将扩展的节点预留位置；预算用完且回收不出空间时返回 False
+    def reserve(self, root, node):
+        if self.nodes >= self._next_measure:
+            self._measure(root)
+        if self.nodes >= self.limit:
+            if self.prune:
+                self._prune(root, node)
+            elif not self._full:
+                # 停止扩展前用长成的树重新估计一次，估计值变小时还能继续扩展
+                self._full = True
+                self._measure(root)
+            if self.nodes >= self.limit:
+                return False
+        self.nodes += 1
+        return True
+
+    def _prune(self, root, protect):
+        # 只回收叶子，着法放回父节点的 untried_moves，以后需要时重新扩展；父节点的统计保持不变
+        # 按访问次数从少到多、同样次数先深后浅处理，子孙的访问次数不多于祖先，
+        # 所以轮到一个节点时它的子节点通常已被回收。根的子节点和已证明的节点保留
+        self._measure(root)
+        if self.nodes < self.limit:
+            return
+        candidates = []
+        stack = [(child, 1) for child in root.children]
+        while stack:
+            node, depth = stack.pop()
+            for child in node.children:
+                candidates.append((child, depth + 1))
+                stack.append((child, depth + 1))
+        candidates.sort(key=lambda item: (item[0].visits, -item[1]))
+        target = self.limit - max(int(self.limit * self.PRUNE_FRACTION), 1)
+        for node, _ in candidates:
+            if self.nodes <= target:
+                break
+            if node.children or node is protect or node.proven is not None:
+                continue
+            parent = node.parent
+            parent.children.remove(node)
+            parent.untried_moves.append(node.move)
+            node.parent = None
+            self.nodes -= 1
+            self.pruned += 1
+
+# 用 sys.getsizeof 估计一个节点连同其局面占用的字节数
+def node_bytes(node):
+    game = node.game
+    size = sys.getsizeof(node) + sys.getsizeof(game) + sys.getsizeof(game.__dict__)
+    for value in game.__dict__.values():
+        if isinstance(value, list):
+            size += sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value if isinstance(item, list))
+    size += sys.getsizeof(node.children) + sys.getsizeof(node.untried_moves)
+    size += sum(sys.getsizeof(move) for move in node.untried_moves) + sys.getsizeof(node.move)
+    if node.amaf:
+        size += sys.getsizeof(node.amaf) + sum(sys.getsizeof(move) + sys.getsizeof(stats)
+                                               for move, stats in node.amaf.items())
+    return size
+
+def mcts(game, iterations=100, time_limit=1, profiler=None, solver=False, rave_k=0, budget=None):
     root = MCTSNode(game)
+    mcts_search(root, iterations, time_limit, profiler, solver=solver, rave_k=rave_k, budget=budget)
+    return best_child(root, solver).move
+
+# 在已有的树上继续搜索，便于后台思考和子树复用
+def mcts_search(root, iterations=100, time_limit=1, profiler=None, stop=None, solver=False, rave_k=0, budget=None):
     end_time = time.time() + time_limit
-    for _ in range(iterations):
-        if time.time() > end_time:
+    if budget is not None:
+        budget.start(root)
+    for i in range(iterations):
+        # 第一次迭代不看时间：时钟快用完时也要扩展出根节点的子节点，否则没有着法可选
+        if i and time.time() > end_time:
+            break
+        if stop is not None and stop.is_set():
             break
-        node = root
-        while node.untried_moves == [] and node.children != []:
-            node = node.select()
-        if node.untried_moves != []:
+        # 根节点已被证明时继续搜索没有意义
+        if solver and root.proven is not None:
+            break
+        if profiler is None:
+            node = root
+            while node.untried_moves == [] and node.children != []:
+                node = node.select(solver, rave_k)
+            if node.untried_moves != [] and (budget is None or budget.reserve(root, node)):
+                node = node.expand()
+            if rave_k:
+                played = []
+                result = node.simulate(played=played)
+                node.backpropagate_rave(result, played)
+            else:
+                result = node.simulate()
+                node.backpropagate(result)
+            if solver and node.proven is not None:
+                _update_proven(node.parent)
+        else:
+            _profiled_iteration(root, profiler, solver, rave_k, budget)
+            _track_stability(root, profiler, solver)
+    if budget is not None:
+        budget.finish(root)
+    if profiler is not None and budget is not None:
+        profiler.note('tree_nodes', budget.nodes)
+        profiler.note('tree_bytes', budget.bytes)
+        profiler.note('pruned_nodes', budget.pruned)
+    return root
+
+def best_child(root, solver=False):
+    if solver:
+        to_move = root.game.current_player
+        for child in root.children:
+            if child.proven == to_move:
+                return child
+        # 避开已证明必败的着法
+        safe = [c for c in root.children if c.proven is None or c.proven == 'Draw']
+        if safe:
+            return max(safe, key=lambda c: c.visits)
+    return max(root.children, key=lambda c: c.visits)
+
+# 结果对 player 的价值：胜 1，和 0，负 -1
+def _outcome_value(outcome, player):
+    if outcome == player:
+        return 1
+    return 0 if outcome == 'Draw' else -1
+
+# 把已证明的结果沿路径向上传播
+def _update_proven(node):
+    while node is not None and node.proven is None:
+        to_move = node.game.current_player
+        if any(c.proven == to_move for c in node.children):
+            node.proven = to_move
+        elif not node.untried_moves and all(c.proven is not None for c in node.children):
+            node.proven = max((c.proven for c in node.children), key=lambda o: _outcome_value(o, to_move))
+        else:
+            break
+        node = node.parent
+
+# 对手落子后，在旧树中找到与当前局面一致的子节点作为新的根
+def find_subtree(root, game):
+    key = game.key()
+    for child in root.children:
+        if child.game.key() == key:
+            child.parent = None
+            return child
+    return None
+
+# 与 mcts 主循环相同的一次迭代，但分别统计四个阶段的次数和耗时
+def _profiled_iteration(root, profiler, solver=False, rave_k=0, budget=None):
+    clock = time.perf_counter
+    t0 = clock()
+    node = root
+    while node.untried_moves == [] and node.children != []:
+        node = node.select(solver, rave_k)
+        profiler.count('select')
+    t1 = clock()
+    if node.untried_moves != []:
+        if budget is None or budget.reserve(root, node):
             node = node.expand()
-        result = node.simulate()
+            profiler.count('expand')
+        else:
+            profiler.count('expand_skipped')
+    t2 = clock()
+    played = [] if rave_k else None
+    result = node.simulate(profiler, played)
+    t3 = clock()
+    if rave_k:
+        node.backpropagate_rave(result, played)
+    else:
         node.backpropagate(result)
-    return max(root.children, key=lambda c: c.visits).move
\ No newline at end of file
+    if solver and node.proven is not None:
+        _update_proven(node.parent)
+        profiler.count('proven_leaves')
+    t4 = clock()
+    profiler.add_time('select', t1 - t0)
+    profiler.add_time('expand', t2 - t1)
+    profiler.add_time('simulate', t3 - t2)
+    profiler.add_time('backpropagate', t4 - t3)
+    profiler.count('iterations')
+
+# 记录根节点最佳着法最后一次变化时的迭代数，用于比较收敛速度
+def _track_stability(root, profiler, solver):
+    move = best_child(root, solver).move
+    if profiler.values.get('best_move') != move:
+        profiler.note('best_move', move)
+        profiler.note('stable_since_iteration', root.visits)
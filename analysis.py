@@ -0,0 +1,191 @@
+# analysis.py
+import argparse
+import json
+import multiprocessing
+import sys
+import threading
+import time
+from ai import MCTSNode, SearchAborted, best_child
+from game import NineBoardTicTacToe
+from player import MinimaxPlayer, MCTSPlayer, create_player
+from profiler import SearchProfiler
+
+# 批量局面分析：读取局面文件，用任意引擎在固定的深度、节点数或时间预算下逐个分析，
+# 每完成一个就以 JSON Lines 输出
+# 每行一个局面，支持三种写法：
+#   走法序列：空格或逗号分隔的 board * 9 + cell，例如 "40 36 0"
+#   局面字符串：NineBoardTicTacToe.to_position() 的格式
+#   JSON：{"id": ..., "moves": [...]} 或 {"id": ..., "position": "..."}
+
+def parse_position(line):
+    line = line.strip()
+    position_id = None
+    if line.startswith('{'):
+        data = json.loads(line)
+        position_id = data.get('id')
+        if 'position' in data:
+            return position_id, NineBoardTicTacToe.from_position(data['position'])
+        moves = data.get('moves', [])
+    elif len(line.split()) == 3 and len(line.split()[0]) == 81:
+        return position_id, NineBoardTicTacToe.from_position(line)
+    else:
+        moves = [int(token) for token in line.replace(',', ' ').split()]
+    game = NineBoardTicTacToe()
+    for move in moves:
+        board_index, cell_index = divmod(move, 9) if isinstance(move, int) else move
+        if (board_index, cell_index) not in game.get_valid_moves():
+            raise ValueError(f"Illegal move {move} in move sequence")
+        game.make_move(board_index, cell_index)
+    return position_id, game
+
+# 节点数超过预算时通过 stop 事件中断搜索
+class _NodeBudget(SearchProfiler):
+    def __init__(self, limit, stop):
+        super().__init__()
+        self.limit = limit
+        self.stop = stop
+        self.nodes = 0
+
+    def visit(self, depth):
+        self.nodes += 1
+        if self.limit is not None and self.nodes >= self.limit:
+            self.stop.set()
+
+def _analyse_minimax(player, game, depth, nodes, time_limit):
+    stop = threading.Event()
+    budget = _NodeBudget(nodes, stop)
+    timer = threading.Timer(time_limit, stop.set) if time_limit is not None else None
+    if timer is not None:
+        timer.start()
+    # 只给了时间或节点预算时不限深度，一直加深到预算用完；搜索深度不会超过剩余的空格数
+    if depth is not None:
+        max_depth = depth
+    elif nodes is not None or time_limit is not None:
+        max_depth = float('inf')
+    else:
+        max_depth = player.max_depth
+    max_depth = min(max_depth, sum(board.count(' ') for board in game.boards))
+    best_move = score = None
+    pv = []
+    completed = 0
+    try:
+        current = 1
+        while current <= max_depth:
+            # 主变例在搜索中顺带得到，不需要额外搜索
+            line = []
+            try:
+                result, move = player._search(game, current, score, budget, stop, line)
+            except SearchAborted:
+                break
+            if move is not None:
+                score, best_move, pv = result, move, line
+            completed = current
+            current += 1
+    finally:
+        if timer is not None:
+            timer.cancel()
+    if best_move is None:
+        return None
+    # minimax 的分数以 X 为视角，pvs 以行棋方为视角，统一换成行棋方视角
+    if player.algorithm == 'minimax' and game.current_player == 'O':
+        score = -score
+    return {'best_move': list(best_move), 'score': score, 'depth': completed, 'nodes': budget.nodes,
+            'pv': [list(move) for move in pv]}
+
+def _analyse_mcts(player, game, nodes, time_limit):
+    root = MCTSNode(game.clone())
+    # 与 minimax 相同：只给了一种预算时另一种不设上限，两种都没给才用玩家自己的设置
+    if nodes is None and time_limit is None:
+        iterations, time_limit = player.iterations, player.time_limit
+    else:
+        iterations = nodes if nodes is not None else sys.maxsize
+        time_limit = time_limit if time_limit is not None else float('inf')
+    player._search(root, iterations, time_limit)
+    if not root.children:
+        return None
+    child = best_child(root, player.solver)
+    sign = 1 if game.current_player == 'X' else -1
+    pv = []
+    node = child
+    while node is not None:
+        pv.append(list(node.move))
+        node = max(node.children, key=lambda c: c.visits) if node.children else None
+    return {'best_move': list(child.move), 'score': sign * child.score / child.visits if child.visits else 0,
+            'nodes': root.visits, 'pv': pv, 'proven': root.proven}
+
+def analyse_position(player, game, depth=None, nodes=None, time_limit=None):
+    start_time = time.time()
+    if game.is_terminal():
+        result = {'best_move': None, 'winner': game.winner}
+    elif isinstance(player, MinimaxPlayer):
+        result = _analyse_minimax(player, game, depth, nodes, time_limit)
+    elif isinstance(player, MCTSPlayer):
+        if depth is not None:
+            raise ValueError("MCTS has no search depth; use a node or time budget")
+        result = _analyse_mcts(player, game, nodes, time_limit)
+    else:
+        move = player.get_move(game)
+        result = {'best_move': list(move) if move else None}
+    result = result or {'best_move': None}
+    result['position'] = game.to_position()
+    result['time'] = time.time() - start_time
+    return result
+
+_worker_player = None
+_worker_budget = None
+
+def _init_worker(spec, budget):
+    global _worker_player, _worker_budget
+    _worker_player = create_player(spec)
+    _worker_budget = budget
+
+def _analyse_task(task):
+    index, line = task
+    try:
+        position_id, game = parse_position(line)
+        result = analyse_position(_worker_player, game, **_worker_budget)
+    except (ValueError, KeyError, TypeError) as e:
+        position_id = None
+        result = {'error': str(e)}
+    result['index'] = index
+    result['id'] = position_id if position_id is not None else index
+    return result
+
+# 用进程池分析所有局面，按完成顺序逐个产出结果
+def analyse_batch(lines, spec, depth=None, nodes=None, time_limit=None, processes=None):
+    budget = {'depth': depth, 'nodes': nodes, 'time_limit': time_limit}
+    tasks = [(index, line) for index, line in enumerate(lines) if line.strip() and not line.startswith('#')]
+    if processes == 1:
+        _init_worker(spec, budget)
+        yield from map(_analyse_task, tasks)
+        return
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(spec, budget)) as pool:
+        yield from pool.imap_unordered(_analyse_task, tasks)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analyse a file of Nine-Board Tic-Tac-Toe positions')
+    parser.add_argument('positions', help="positions file, '-' for stdin")
+    parser.add_argument('--engine', default='minimax:algorithm="pvs"', help='player spec, see player.create_player')
+    parser.add_argument('--depth', type=int, help='fixed search depth (minimax engines)')
+    parser.add_argument('--nodes', type=int, help='node budget (minimax nodes or MCTS iterations)')
+    parser.add_argument('--time', type=float, dest='time_limit', help='time budget per position in seconds')
+    parser.add_argument('--processes', type=int, help='worker processes (default: CPU count)')
+    parser.add_argument('--output', help='write JSON Lines here instead of stdout')
+    args = parser.parse_args(argv)
+    if args.depth is not None and args.engine.partition(':')[0].lower() == 'mcts':
+        parser.error("--depth only applies to minimax engines; use --nodes or --time with MCTS")
+
+    source = sys.stdin if args.positions == '-' else open(args.positions)
+    with source:
+        lines = source.readlines()
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for result in analyse_batch(lines, args.engine, args.depth, args.nodes, args.time_limit, args.processes):
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+if __name__ == '__main__':
+    main()
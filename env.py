@@ -0,0 +1,196 @@
+# env.py
+import numpy as np
+from game import NineBoardTicTacToe
+from tables import MARK_VALUE, POW3, NUM_STATES, WINNER, FULL
+
+# 供学习型智能体使用的 NumPy 接口
+# 动作编号为 board * 9 + cell，共 81 个；观测的形状为 (OBS_PLANES, 9, 9)，按 [平面, 棋盘, 格子] 排列，
+# 所以 obs[p].reshape(81) 与动作编号一一对应。所有平面都以轮到的一方为视角：
+OWN = 0           # 己方棋子
+OPPONENT = 1      # 对方棋子
+OWN_WON = 2       # 己方赢下的小棋盘（整块棋盘为 1）
+OPPONENT_WON = 3  # 对方赢下的小棋盘
+ACTIVE = 4        # 本步可以落子的小棋盘
+OBS_PLANES = 5
+NUM_ACTIONS = 81
+
+# 与 tables.py 相同的三进制编码，只是换成数组，便于整批查表
+CELL_MARKS = (np.arange(NUM_STATES)[:, None] // np.array(POW3) % 3).astype(np.int8)  # code -> 每格 0/1/2
+EMPTY_CELLS = CELL_MARKS == 0
+WINNER_VALUE = np.array([MARK_VALUE[w] for w in WINNER], dtype=np.int8)             # code -> 0/1/2
+FULL_BOARD = np.array(FULL, dtype=bool)
+POW3_ARRAY = np.array(POW3, dtype=np.int32)
+BOARDS = np.arange(9)
+
+# 以下函数都按批处理：codes (n, 9)，winners_code、players、active、done 为 (n,)
+# players 为 1（X）或 2（O），active 为可落子的棋盘（-1 表示任意），done 为 None 表示都未结束
+
+def _playable_boards(codes, winners_code, active, done):
+    # (n, 9)：既没有赢家也没下满、且符合落子限制的棋盘
+    board_open = (CELL_MARKS[winners_code] == 0) & ~FULL_BOARD[codes]
+    playable = board_open & ((active[:, None] < 0) | (BOARDS == active[:, None]))
+    if done is not None:
+        playable &= ~done[:, None]
+    return playable
+
+def legal_masks(codes, winners_code, active, done, out):
+    # out: (n, 9, 9) 的 bool 数组
+    np.logical_and(EMPTY_CELLS[codes], _playable_boards(codes, winners_code, active, done)[:, :, None], out=out)
+    return out
+
+def observations(codes, winners_code, players, active, done, out):
+    # out: (n, OBS_PLANES, 9, 9)，任意数值类型
+    cells = CELL_MARKS[codes]
+    won = CELL_MARKS[winners_code]
+    own = players[:, None, None]
+    out[:, OWN] = cells == own
+    out[:, OPPONENT] = cells == 3 - own
+    out[:, OWN_WON] = won[:, :, None] == own
+    out[:, OPPONENT_WON] = won[:, :, None] == 3 - own
+    out[:, ACTIVE] = _playable_boards(codes, winners_code, active, done)[:, :, None]
+    return out
+
+def _game_arrays(game):
+    return (np.array([game.board_codes]), np.array([game.winners_code]),
+            np.array([MARK_VALUE[game.current_player]]), np.array([game.current_board_index]),
+            np.array([game.game_over]))
+
+def game_action_mask(game, out=None):
+    if out is None:
+        out = np.empty(NUM_ACTIONS, dtype=bool)
+    codes, winners_code, _, active, done = _game_arrays(game)
+    legal_masks(codes, winners_code, active, done, out.reshape(1, 9, 9))
+    return out
+
+def game_observation(game, out=None, dtype=np.float32):
+    if out is None:
+        out = np.empty((OBS_PLANES, 9, 9), dtype=dtype)
+    observations(*_game_arrays(game), out[None])
+    return out
+
+# Gym 风格的单局环境，双方轮流调用 step（自我对弈）；给定 opponent（player.py 中的玩家）时
+# 对手在 step 内自动应着，智能体只执一方
+# step 返回 (obs, reward, terminated, truncated, info)，reward 以刚走棋的智能体为视角：胜 1、负 -1、和 0
+# 观测和掩码写在预先分配的数组里，每次返回同一个数组，需要保留时请自行 copy
+class NineBoardEnv:
+    def __init__(self, opponent=None, agent_side='X'):
+        self.opponent = opponent
+        self.agent_side = agent_side
+        self.game = None
+        self._obs = np.empty((OBS_PLANES, 9, 9), dtype=np.float32)
+        self._mask = np.empty(NUM_ACTIONS, dtype=bool)
+
+    def reset(self):
+        self.game = NineBoardTicTacToe()
+        if self.opponent is not None:
+            if hasattr(self.opponent, 'new_game'):
+                self.opponent.new_game()
+            if self.agent_side == 'O':
+                self._opponent_move()
+        return self._observe(), self._info()
+
+    def action_mask(self):
+        return self.game.legal_action_mask(self._mask)
+
+    def step(self, action):
+        board_index, cell_index = divmod(int(action), 9)
+        if self.game.game_over or (board_index, cell_index) not in self.game.get_valid_moves():
+            raise ValueError(f"Illegal action {action}")
+        mover = self.game.current_player
+        self.game.make_move(board_index, cell_index)
+        if self.opponent is not None and not self.game.game_over:
+            self._opponent_move()
+        reward = 0.0
+        if self.game.game_over and self.game.winner != 'Draw':
+            reward = 1.0 if self.game.winner == mover else -1.0
+        return self._observe(), reward, self.game.game_over, False, self._info()
+
+    def close(self):
+        if self.opponent is not None and hasattr(self.opponent, 'stop_pondering'):
+            self.opponent.stop_pondering()
+
+    def _opponent_move(self):
+        self.game.make_move(*self.opponent.get_move(self.game))
+
+    def _observe(self):
+        return self.game.observation(self._obs)
+
+    def _info(self):
+        return {'action_mask': self.action_mask(), 'current_player': self.game.current_player,
+                'winner': self.game.winner}
+
+# 同时推进 n 局自我对弈：状态保存在数组中，规则用 tables.py 的查表结果整批计算，
+# 一次 step 不需要逐局调用 Python 代码
+# 某局结束后立即重新开始，返回的观测已是新一局的开局；刚结束的局在 info['winner'] 中给出 1（X）、2（O）或 3（和）
+# 返回的数组都是预先分配的缓冲区，下次 step 会被覆盖
+class VectorNineBoardEnv:
+    def __init__(self, num_envs, dtype=np.float32):
+        self.num_envs = num_envs
+        self.codes = np.zeros((num_envs, 9), dtype=np.int32)
+        self.winners_code = np.zeros(num_envs, dtype=np.int32)
+        self.players = np.ones(num_envs, dtype=np.int8)
+        self.active = np.full(num_envs, -1, dtype=np.int8)
+        self.observations = np.zeros((num_envs, OBS_PLANES, 9, 9), dtype=dtype)
+        self.masks = np.zeros((num_envs, NUM_ACTIONS), dtype=bool)
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.terminated = np.zeros(num_envs, dtype=bool)
+        self.truncated = np.zeros(num_envs, dtype=bool)
+        self.winners = np.zeros(num_envs, dtype=np.int8)
+        self._index = np.arange(num_envs)
+
+    def reset(self):
+        self._reset(self._index)
+        self._refresh()
+        self.winners[:] = 0
+        return self.observations, self._info()
+
+    def _reset(self, envs):
+        self.codes[envs] = 0
+        self.winners_code[envs] = 0
+        self.players[envs] = 1
+        self.active[envs] = -1
+
+    def _refresh(self):
+        # 结束的局已经重新开始，所以不需要 done
+        legal_masks(self.codes, self.winners_code, self.active, None, self.masks.reshape(-1, 9, 9))
+        observations(self.codes, self.winners_code, self.players, self.active, None, self.observations)
+
+    def _info(self):
+        return {'action_mask': self.masks, 'winner': self.winners}
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        index = self._index
+        if not self.masks[index, actions].all():
+            raise ValueError(f"Illegal actions in environments {np.flatnonzero(~self.masks[index, actions]).tolist()}")
+        board_index, cell_index = np.divmod(actions, 9)
+        players = self.players.astype(np.int32)
+        self.codes[index, board_index] += players * POW3_ARRAY[cell_index]
+        board_winner = WINNER_VALUE[self.codes[index, board_index]]
+        self.winners_code += board_winner * POW3_ARRAY[board_index]
+
+        # 下一步的棋盘由本步的格子决定，该棋盘已关闭时可任意落子
+        board_marks = CELL_MARKS[self.winners_code]
+        next_open = (board_marks[index, cell_index] == 0) & ~FULL_BOARD[self.codes[index, cell_index]]
+        self.active[:] = np.where(next_open, cell_index, -1)
+
+        winner = WINNER_VALUE[self.winners_code]
+        all_closed = ((board_marks != 0) | FULL_BOARD[self.codes]).all(axis=1)
+        finished = (winner != 0) | all_closed
+        # 走棋的一方只可能让自己获胜
+        self.rewards[:] = winner == players
+        self.terminated[:] = finished
+        self.winners[:] = np.where(winner != 0, winner, np.where(finished, 3, 0))
+        self.players[:] = 3 - self.players
+
+        if finished.any():
+            self._reset(np.flatnonzero(finished))
+        self._refresh()
+        return self.observations, self.rewards, self.terminated, self.truncated, self._info()
+
+    # 把第 i 局转换成 NineBoardTicTacToe，便于与搜索型玩家对接或检查
+    def game(self, i):
+        cells = ''.join('.XO'[mark] for mark in CELL_MARKS[self.codes[i]].reshape(-1))
+        side = 'X' if self.players[i] == 1 else 'O'
+        active = '-' if self.active[i] < 0 else str(self.active[i])
+        return NineBoardTicTacToe.from_position(f'{cells} {side} {active}')
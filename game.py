@@ -1,5 +1,5 @@
 # game.py
-import copy
+from tables import MARK_VALUE, POW3, WINNER, FULL, LEGAL_CELLS, ZOBRIST, ZOBRIST_ACTIVE, ZOBRIST_SIDE, board_code
 
 class NineBoardTicTacToe:
     def __init__(self):
@@ -15,29 +15,26 @@ class NineBoardTicTacToe:
         self.board_winners = [' ' for _ in range(9)]
         # 总的赢家
         self.winner = None
+        # 每个小棋盘和大棋盘胜负的三进制编码，用于查预计算表（见 tables.py）
+        self.board_codes = [0] * 9
+        self.winners_code = 0
+        # 落子部分的 Zobrist 哈希，随 make_move 增量更新
+        self.stones_hash = 0
 
     def switch_player(self):
         self.current_player = 'O' if self.current_player == 'X' else 'X'
 
     def is_full(self, board):
-        return ' ' not in board
+        return FULL[board_code(board)]
 
     def check_winner(self, board):
         # 检查行、列、对角线
-        lines = [
-            [board[0], board[1], board[2]],
-            [board[3], board[4], board[5]],
-            [board[6], board[7], board[8]],
-            [board[0], board[3], board[6]],
-            [board[1], board[4], board[7]],
-            [board[2], board[5], board[8]],
-            [board[0], board[4], board[8]],
-            [board[2], board[4], board[6]],
-        ]
-        for line in lines:
-            if line[0] == line[1] == line[2] and line[0] != ' ':
-                return line[0]
-        return None
+        winner = WINNER[board_code(board)]
+        return winner if winner != ' ' else None
+
+    def is_open(self, board_index):
+        # 小棋盘既没有赢家也没有下满时才能落子
+        return self.board_winners[board_index] == ' ' and not FULL[self.board_codes[board_index]]
 
     def make_move(self, board_index, cell_index):
         if self.board_winners[board_index] != ' ':
@@ -45,9 +42,14 @@ class NineBoardTicTacToe:
         if self.boards[board_index][cell_index] != ' ':
             return False, "该位置已被占用。"
         self.boards[board_index][cell_index] = self.current_player
-        winner = self.check_winner(self.boards[board_index])
-        if winner:
+        value = MARK_VALUE[self.current_player]
+        code = self.board_codes[board_index] + value * POW3[cell_index]
+        self.board_codes[board_index] = code
+        self.stones_hash ^= ZOBRIST[value - 1][board_index * 9 + cell_index]
+        winner = WINNER[code]
+        if winner != ' ':
             self.board_winners[board_index] = winner
+            self.winners_code += MARK_VALUE[winner] * POW3[board_index]
 
         # 将 cell_index 转换为 (row, col)，然后计算下一个 board_index
         cell_row = cell_index // 3
@@ -56,7 +58,7 @@ class NineBoardTicTacToe:
         self.current_board_index = next_board_index
 
         # 如果下一个棋盘已满或已有人赢得，则玩家可选择任意棋盘
-        if self.is_full(self.boards[self.current_board_index]) or self.board_winners[self.current_board_index] != ' ':
+        if not self.is_open(self.current_board_index):
             self.current_board_index = -1
 
         # 检查游戏是否结束
@@ -68,17 +70,17 @@ class NineBoardTicTacToe:
     def get_valid_moves(self):
         moves = []
         if self.current_board_index == -1:
-            boards_to_check = [i for i in range(9) if self.board_winners[i] == ' ' and not self.is_full(self.boards[i])]
+            boards_to_check = [i for i in range(9) if self.is_open(i)]
         else:
-            if self.board_winners[self.current_board_index] == ' ' and not self.is_full(self.boards[self.current_board_index]):
+            if self.is_open(self.current_board_index):
                 boards_to_check = [self.current_board_index]
             else:
-                boards_to_check = [i for i in range(9) if self.board_winners[i] == ' ' and not self.is_full(self.boards[i])]
+                boards_to_check = [i for i in range(9) if self.is_open(i)]
                 self.current_board_index = -1
+        codes = self.board_codes
         for board_idx in boards_to_check:
-            for cell_idx in range(9):
-                if self.boards[board_idx][cell_idx] == ' ':
-                    moves.append((board_idx, cell_idx))
+            for cell_idx in LEGAL_CELLS[codes[board_idx]]:
+                moves.append((board_idx, cell_idx))
         return moves
 
     def is_terminal(self):
@@ -86,11 +88,11 @@ class NineBoardTicTacToe:
 
     def check_game_over(self):
         # 检查大棋盘的赢家
-        winner = self.check_winner(self.board_winners)
-        if winner:
+        winner = WINNER[self.winners_code]
+        if winner != ' ':
             self.game_over = True
             self.winner = winner
-        elif all(winner != ' ' or self.is_full(self.boards[i]) for i, winner in enumerate(self.board_winners)):
+        elif all(winner != ' ' or FULL[code] for winner, code in zip(self.board_winners, self.board_codes)):
             self.game_over = True
             self.winner = 'Draw'
 
@@ -104,5 +106,70 @@ class NineBoardTicTacToe:
                 score -= 1
         return score
 
+    def key(self):
+        # 局面的唯一标识，用于在后台思考后复用搜索结果
+        return (tuple(cell for board in self.boards for cell in board), self.current_board_index, self.current_player)
+
+    def to_position(self):
+        # 紧凑的局面字符串：81 个格子（X、O 或 .，按棋盘再按格子排列）、轮到哪一方、可落子的棋盘（- 表示任意）
+        cells = ''.join(cell if cell != ' ' else '.' for board in self.boards for cell in board)
+        active = '-' if self.current_board_index == -1 else str(self.current_board_index)
+        return f'{cells} {self.current_player} {active}'
+
+    @classmethod
+    def from_position(cls, position):
+        parts = position.split()
+        if len(parts) != 3 or len(parts[0]) != 81 or parts[1] not in ('X', 'O'):
+            raise ValueError(f"Invalid position string: {position!r}")
+        cells, side, active = parts
+        game = cls()
+        for index, mark in enumerate(cells):
+            if mark == '.':
+                continue
+            if mark not in ('X', 'O'):
+                raise ValueError(f"Invalid cell {mark!r} in position string")
+            board_index, cell_index = divmod(index, 9)
+            value = MARK_VALUE[mark]
+            game.boards[board_index][cell_index] = mark
+            game.board_codes[board_index] += value * POW3[cell_index]
+            game.stones_hash ^= ZOBRIST[value - 1][index]
+        for board_index, code in enumerate(game.board_codes):
+            winner = WINNER[code]
+            if winner != ' ':
+                game.board_winners[board_index] = winner
+                game.winners_code += MARK_VALUE[winner] * POW3[board_index]
+        game.current_player = side
+        if active != '-':
+            if active not in '012345678' or len(active) != 1:
+                raise ValueError(f"Invalid active board {active!r} in position string")
+            game.current_board_index = int(active)
+            if not game.is_open(game.current_board_index):
+                game.current_board_index = -1
+        game.check_game_over()
+        return game
+
+    def legal_action_mask(self, out=None):
+        # 长度 81 的 NumPy bool 数组，第 board * 9 + cell 项表示该着法是否合法；给定 out 时直接写入 out
+        from env import game_action_mask
+        return game_action_mask(self, out)
+
+    def observation(self, out=None):
+        # 以轮到的一方为视角的 (5, 9, 9) 平面观测，各平面的含义见 env.py
+        from env import game_observation
+        return game_observation(self, out)
+
+    def position_hash(self):
+        # 64 位局面哈希，包含可落子的棋盘和轮到哪一方，进程之间保持一致
+        h = self.stones_hash ^ ZOBRIST_ACTIVE[self.current_board_index + 1]
+        if self.current_player == 'O':
+            h ^= ZOBRIST_SIDE
+        return h
+
     def clone(self):
-        return copy.deepcopy(self)
\ No newline at end of file
+        # 状态只有字符串、整数和一层嵌套的列表，逐项复制比 deepcopy 快得多
+        new = NineBoardTicTacToe.__new__(NineBoardTicTacToe)
+        new.__dict__.update(self.__dict__)
+        new.boards = [board[:] for board in self.boards]
+        new.board_winners = self.board_winners[:]
+        new.board_codes = self.board_codes[:]
+        return new
\ No newline at end of file
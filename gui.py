@@ -140,6 +140,7 @@ class GameGUI:
         while self.running:
             self.draw_board()
             if self.game.game_over:
+                self.stop_pondering()
                 self.show_winner()
                 continue
             # AI player
@@ -152,6 +153,7 @@ class GameGUI:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.running = False
+                    self.stop_pondering()
                     pygame.quit()
                     return
                 elif event.type == pygame.MOUSEBUTTONDOWN:
@@ -165,6 +167,11 @@ class GameGUI:
                                 self.current_player = self.players[self.game.current_player]
             clock.tick(30)
 
+    def stop_pondering(self):
+        for player in self.players.values():
+            if hasattr(player, 'stop_pondering'):
+                player.stop_pondering()
+
     def show_winner(self):
         winner = self.game.winner
         if winner == 'Draw':
@@ -326,9 +333,9 @@ class GameGUI:
 
         ai_options = [
             {"name": "Random", "params": []},
-            {"name": "Minimax", "params": ["Depth", "Time Limit"]},
-            {"name": "AlphaBeta", "params": ["Depth", "Time Limit"]},
-            {"name": "MCTS", "params": ["Iterations", "Time Limit"]}
+            {"name": "Minimax", "params": ["Depth", "Time Limit", "Ponder"]},
+            {"name": "AlphaBeta", "params": ["Depth", "Time Limit", "Ponder"]},
+            {"name": "MCTS", "params": ["Iterations", "Time Limit", "Ponder"]}
         ]
 
         button_width, button_height = 200, 50
@@ -369,7 +376,8 @@ class GameGUI:
         default_values_and_notes = {
             "Depth": {"value": "5", "note": "Search depth (higher = stronger but slower)"},
             "Time Limit": {"value": "5", "note": "Max time per move in seconds"},
-            "Iterations": {"value": "500", "note": "Number of simulations (higher = stronger but slower)"}
+            "Iterations": {"value": "500", "note": "Number of simulations (higher = stronger but slower)"},
+            "Ponder": {"value": "0", "note": "1 = keep thinking during your turn"}
         }
 
         input_boxes = [{"name": param, 
@@ -0,0 +1,110 @@
+# headless.py
+import itertools
+import multiprocessing
+import random
+import time
+from game import NineBoardTicTacToe
+from rating import match_elo, round_robin_elo
+from records import GameRecord, RecordWriter, player_params
+
+# 不依赖 GUI 的对局循环，可以在进程池中并行运行
+
+def play_game(x_player, o_player, seed=None):
+    if seed is not None:
+        random.seed(seed)
+    game = NineBoardTicTacToe()
+    for player in (x_player, o_player):
+        if hasattr(player, 'new_game'):
+            player.new_game()
+    players = {'X': x_player, 'O': o_player}
+    moves = []
+    times = []
+    while not game.game_over:
+        start_time = time.time()
+        move = players[game.current_player].get_move(game)
+        times.append(time.time() - start_time)
+        game.make_move(*move)
+        moves.append(move)
+    for player in (x_player, o_player):
+        if hasattr(player, 'stop_pondering'):
+            player.stop_pondering()
+    return {'winner': game.winner, 'moves': moves, 'times': times, 'seed': seed}
+
+def _play_task(task):
+    player_a, player_b, index, a_is_x, seed = task
+    if a_is_x:
+        result = play_game(player_a, player_b, seed)
+    else:
+        result = play_game(player_b, player_a, seed)
+    result['index'] = index
+    result['a_is_x'] = a_is_x
+    return result
+
+def _outcome(result):
+    # 从 player_a 的角度返回 'wins'、'losses' 或 'draws'
+    if result['winner'] == 'Draw':
+        return 'draws'
+    a_side = 'X' if result['a_is_x'] else 'O'
+    return 'wins' if result['winner'] == a_side else 'losses'
+
+# 两个玩家交替执先对局，结果一出来就更新统计；给定 sprt 时一旦检验有结论就提前结束
+# resume 为中断前的进度 {'wins', 'losses', 'draws', 'completed': 已完成的局号}，
+# 这些局不再重下（局号决定先后手和种子，seed 相同时续跑与一次跑完相同），比分从这里继续累计
+def run_match(player_a, player_b, max_games=100, sprt=None, processes=None, seed=None, record_path=None,
+              on_result=None, resume=None):
+    rng = random.Random(seed)
+    tasks = [(player_a, player_b, i, i % 2 == 0, rng.randrange(2 ** 32)) for i in range(max_games)]
+    stats = {'wins': 0, 'losses': 0, 'draws': 0}
+    if resume is not None:
+        tasks = [task for task in tasks if task[2] not in resume['completed']]
+        stats = {outcome: resume[outcome] for outcome in stats}
+    status = None
+    if sprt is not None:
+        # 中断前检验已经有结论的比赛不再继续
+        status = sprt.status(stats['wins'], stats['losses'], stats['draws'])
+        if status is not None:
+            tasks = []
+    writer = RecordWriter(record_path) if record_path else None
+    pool = multiprocessing.Pool(processes) if processes != 1 else None
+    try:
+        results = pool.imap_unordered(_play_task, tasks) if pool is not None else map(_play_task, tasks)
+        for result in results:
+            stats[_outcome(result)] += 1
+            if writer is not None:
+                x, o = (player_a, player_b) if result['a_is_x'] else (player_b, player_a)
+                writer.append(GameRecord({'X': x.name, 'O': o.name},
+                                         {p.name: player_params(p) for p in (x, o)},
+                                         result['seed'], result['moves'], result['times'], result['winner']))
+            if on_result is not None:
+                on_result(player_a, player_b, result)
+            if sprt is not None:
+                status = sprt.status(stats['wins'], stats['losses'], stats['draws'])
+                if status is not None:
+                    break
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        if writer is not None:
+            writer.close()
+
+    stats['games'] = stats['wins'] + stats['losses'] + stats['draws']
+    stats['elo'] = match_elo(stats['wins'], stats['losses'], stats['draws'])
+    if sprt is not None:
+        stats['sprt'] = status
+        stats['llr'] = sprt.llr(stats['wins'], stats['losses'], stats['draws'])
+    return stats
+
+# 循环赛：每对玩家跑一场 run_match，最后用所有结果一起计算 Elo
+# resume: {(a 的名字, b 的名字): run_match 的 resume 进度}
+def round_robin(players, games_per_pair=100, sprt=None, processes=None, seed=None, record_path=None,
+                on_result=None, resume=None):
+    pair_results = {}
+    matches = {}
+    for player_a, player_b in itertools.combinations(players, 2):
+        progress = resume.get((player_a.name, player_b.name)) if resume is not None else None
+        stats = run_match(player_a, player_b, games_per_pair, sprt, processes, seed, record_path, on_result,
+                          progress)
+        matches[(player_a.name, player_b.name)] = stats
+        pair_results[(player_a.name, player_b.name)] = (stats['wins'], stats['losses'], stats['draws'])
+    return matches, round_robin_elo(pair_results)
@@ -1,28 +1,48 @@
 # main.py
-import time
-import psutil
-import matplotlib.pyplot as plt
-import numpy as np
-from gui import GameGUI
-from player import RandomPlayer, MinimaxPlayer, AlphaBetaPlayer, MCTSPlayer, HumanPlayer
-from game import NineBoardTicTacToe
+import argparse
 import itertools
-import pygame
-import matplotlib.pyplot as plt
-from matplotlib.table import Table
+import os
+import random
+import subprocess
 import sys
-import threading
-import copy
+import time
+from player import RandomPlayer, MinimaxPlayer, AlphaBetaPlayer, MCTSPlayer, HumanPlayer, create_player
+from game import NineBoardTicTacToe
+from records import GameRecord, RecordWriter, player_params
+from rating import match_elo, round_robin_elo, SPRT
+from tournament_stats import TournamentStats
+from timecontrol import parse_clock
+
+# pygame/gui、matplotlib/numpy 和 psutil 导入很慢，只在用到它们的函数里导入，
+# 这样 headless、analyse、serve 和 bench 模式启动时不需要加载 GUI 和绘图库
 
 # 添加全局标志
 program_should_exit = False
+# 每局的完整记录追加到这个文件（索引在 games.nbr.idx）
+GAME_RECORDS_PATH = 'games.nbr'
+# 比赛统计的检查点，gui --resume 从这里继续未完成的比赛
+STATS_CHECKPOINT_PATH = 'tournament_stats.json'
 
 def initialize_pygame():
-    pygame.init()
+    # GameGUI.__init__ 会调用 pygame.init()
+    from gui import GameGUI
     return GameGUI()
 
-def ai_vs_ai(player1, player2, num_games=10):
+# results 中 'X' 记 player1 的胜局、'O' 记 player2 的胜局；双方每局交换先后手
+# completed 中的局号跳过不下；每局结束后调用 on_game(局号, 执 X 者名字, winner, 每步耗时, 每步 CPU)
+def ai_vs_ai(player1, player2, num_games=10, record_path=None, completed=(), on_game=None):
+    writer = RecordWriter(record_path) if record_path else None
+    try:
+        return _play_match(player1, player2, num_games, writer, completed, on_game)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def _play_match(player1, player2, num_games, writer, completed, on_game):
     global program_should_exit
+    import psutil
+    import pygame
+    from gui import GameGUI
     results = {'X': 0, 'O': 0, 'Draw': 0}
     player_stats = {
         player1.name: {'total_time': 0, 'total_moves': 0, 'total_cpu': 0},
@@ -32,13 +52,37 @@ def ai_vs_ai(player1, player2, num_games=10):
     for game_num in range(num_games):
         if program_should_exit:
             return None, None
+        if game_num in completed:
+            continue
         game = NineBoardTicTacToe()
+        for player in (player1, player2):
+            if hasattr(player, 'new_game'):
+                player.new_game()
+        # 交替执先，消除先手优势
+        x_player, o_player = (player1, player2) if game_num % 2 == 0 else (player2, player1)
+        record = None
+        if writer is not None:
+            # 记录每局的随机种子，便于复现
+            seed = random.randrange(2 ** 32)
+            random.seed(seed)
+            record = GameRecord({'X': x_player.name, 'O': o_player.name},
+                                {player.name: player_params(player) for player in (player1, player2)}, seed)
         gui.game = game
-        gui.set_players(player1, player2)
-        gui.set_game_info(game_num + 1, num_games, results)
-        current_player = player1
+        gui.set_players(x_player, o_player)
+        # GUI 按棋盘上的 X/O 显示战绩
+        if x_player is player1:
+            side_results = results
+        else:
+            side_results = {'X': results['O'], 'O': results['X'], 'Draw': results['Draw']}
+        gui.set_game_info(game_num + 1, num_games, side_results)
+        current_player = x_player
+        move_times = []
+        move_cpus = []
         while not game.game_over:
             if gui.should_quit():
+                for player in (player1, player2):
+                    if hasattr(player, 'stop_pondering'):
+                        player.stop_pondering()
                 program_should_exit = True
                 pygame.quit()
                 return None, None
@@ -52,18 +96,34 @@ def ai_vs_ai(player1, player2, num_games=10):
             player_stats[current_player.name]['total_time'] += end_time - start_time
             player_stats[current_player.name]['total_moves'] += 1
             player_stats[current_player.name]['total_cpu'] += end_cpu - start_cpu
+            move_times.append(end_time - start_time)
+            move_cpus.append(end_cpu - start_cpu)
             
             if move:
                 game.make_move(*move)
+                if record is not None:
+                    record.add_move(move, end_time - start_time)
                 gui.draw_board()
                 pygame.display.flip()
                 pygame.time.wait(500)  # 等待500毫秒，便于观察
-            current_player = player2 if current_player == player1 else player1
+            current_player = o_player if current_player == x_player else x_player
 
+        # 对局结束后停止后台思考
+        for player in (player1, player2):
+            if hasattr(player, 'stop_pondering'):
+                player.stop_pondering()
+
+        if record is not None:
+            record.result = game.winner
+            writer.append(record)
         if game.winner == 'Draw':
             results['Draw'] += 1
+        elif (game.winner == 'X') == (x_player is player1):
+            results['X'] += 1
         else:
-            results[game.winner] += 1
+            results['O'] += 1
+        if on_game is not None:
+            on_game(game_num, x_player.name, game.winner, move_times, move_cpus)
         gui.show_winner()
         pygame.time.wait(1000)  # 等待1秒后开始下一局
 
@@ -71,6 +131,7 @@ def ai_vs_ai(player1, player2, num_games=10):
     return results, player_stats
 
 def plot_stats(all_stats):
+    import matplotlib.pyplot as plt
     agents = list(all_stats.keys())
     avg_times = [stats['avg_time'] for stats in all_stats.values()]
     avg_cpus = [stats['avg_cpu'] for stats in all_stats.values()]
@@ -90,6 +151,8 @@ def plot_stats(all_stats):
     plt.close()
 
 def plot_results(all_stats):
+    import matplotlib.pyplot as plt
+    import numpy as np
     agents = list(all_stats.keys())
     wins = [stats['wins'] for stats in all_stats.values()]
     losses = [stats['losses'] for stats in all_stats.values()]
@@ -115,12 +178,13 @@ def plot_results(all_stats):
     plt.close()
 
 def plot_detailed_stats(all_stats):
+    import matplotlib.pyplot as plt
     fig, ax = plt.subplots(figsize=(12, 6))
     ax.axis('off')
     ax.axis('tight')
 
     data = []
-    columns = ['Agent', 'Win Rate', 'Loss Rate', 'Draw Rate', 'Avg Time (s)', 'Avg CPU (%)']
+    columns = ['Agent', 'Win Rate', 'Loss Rate', 'Draw Rate', 'Avg Time (s)', 'P95 Time (s)', 'Avg CPU (%)']
 
     for agent, stats in all_stats.items():
         data.append([
@@ -129,6 +193,7 @@ def plot_detailed_stats(all_stats):
             f"{stats['loss_rate']:.2%}",
             f"{stats['draw_rate']:.2%}",
             f"{stats['avg_time']:.4f}",
+            f"{stats.get('p95', 0):.4f}",
             f"{stats['avg_cpu']:.2f}"
         ])
 
@@ -142,6 +207,23 @@ def plot_detailed_stats(all_stats):
     plt.savefig('detailed_stats.png', dpi=300, bbox_inches='tight')
     plt.close()
 
+def print_report(stats):
+    print("\nDetailed Statistics:")
+    print(stats.format_report())
+    pair_results = stats.pair_results()
+    if pair_results:
+        print("\nElo ratings (95% CI):")
+        ratings = round_robin_elo(pair_results)
+        for player_name, (elo, low, high) in sorted(ratings.items(), key=lambda item: -item[1][0]):
+            print(f"  {player_name}: {elo:+.0f} ({low:+.0f} to {high:+.0f})")
+
+# 用目前为止的结果重新生成统计图表
+def write_reports(stats):
+    all_stats = stats.all_stats()
+    plot_stats(all_stats)
+    plot_results(all_stats)
+    plot_detailed_stats(all_stats)
+
 def human_vs_ai(gui):
     ai_choice = gui.show_ai_selection()
     if ai_choice is None:
@@ -151,21 +233,24 @@ def human_vs_ai(gui):
     ai_name, ai_params = ai_choice
     print(f"Selected AI: {ai_name}, Parameters: {ai_params}")  # Debug info
     human_player = HumanPlayer(name='Human')
+    # 开启后 AI 在人类思考时继续搜索
+    ponder = bool(ai_params.get("Ponder", 0))
 
     if ai_name == "Random":
         ai_player = RandomPlayer(name='RandomAI')
     elif ai_name == "Minimax":
         depth = ai_params.get("Depth", 5)
         time_limit = ai_params.get("Time Limit", 5)
-        ai_player = MinimaxPlayer(depth=depth, time_limit=time_limit, name=f'MinimaxAI_{depth}')
+        ai_player = MinimaxPlayer(depth=depth, time_limit=time_limit, name=f'MinimaxAI_{depth}', ponder=ponder)
     elif ai_name == "AlphaBeta":
         depth = ai_params.get("Depth", 5)
         time_limit = ai_params.get("Time Limit", 5)
-        ai_player = AlphaBetaPlayer(depth=depth, time_limit=time_limit, name=f'AlphaBetaAI_{depth}')
+        ai_player = AlphaBetaPlayer(depth=depth, time_limit=time_limit, name=f'AlphaBetaAI_{depth}', ponder=ponder)
     elif ai_name == "MCTS":
         iterations = ai_params.get("Iterations", 1000)
         time_limit = ai_params.get("Time Limit", 5)
-        ai_player = MCTSPlayer(iterations=iterations, time_limit=time_limit, name=f'MCTSAI_{iterations}')
+        ai_player = MCTSPlayer(iterations=iterations, time_limit=time_limit, name=f'MCTSAI_{iterations}',
+                               ponder=ponder)
     else:
         print(f"Invalid AI choice: {ai_name}")
         return
@@ -174,9 +259,10 @@ def human_vs_ai(gui):
     gui.set_players(human_player, ai_player)
     gui.run()
 
-def main():
+# ponder 为 True 时 AI 对战中的搜索型玩家在对手思考时继续搜索
+def run_gui(resume=False, ponder=False):
     global program_should_exit
-    pygame.init()
+    import pygame
     gui = initialize_pygame()
     
     try:
@@ -204,107 +290,79 @@ def main():
                         time_limit = ai_settings["Minimax Time Limit"]
                         players.append(MinimaxPlayer(depth=depth, 
                                                              time_limit=time_limit, 
-                                                             name=f'MinimaxAgent_D{depth}_T{time_limit}'))
+                                                             name=f'MinimaxAgent_D{depth}_T{time_limit}',
+                                                             ponder=ponder))
                         print(f"Created MinimaxAgent with depth {depth} and time limit {time_limit}")
                     elif agent == "Minimax (Full Search)":
                         players.append(MinimaxPlayer(depth=float('inf'), 
                                                              time_limit=float('inf'), 
-                                                             name='MinimaxAgent_FullSearch'))
+                                                             name='MinimaxAgent_FullSearch',
+                                                             ponder=ponder))
                         print("Created MinimaxAgent with full search (depth and time limit set to infinity)")
                     elif agent == "AlphaBeta":
                         depth = ai_settings["AlphaBeta Depth"]
                         time_limit = ai_settings["AlphaBeta Time Limit"]
                         players.append(AlphaBetaPlayer(depth=depth, 
                                                                time_limit=time_limit, 
-                                                               name=f'AlphaBetaAgent_D{depth}_T{time_limit}'))
+                                                               name=f'AlphaBetaAgent_D{depth}_T{time_limit}',
+                                                               ponder=ponder))
                         print(f"Created AlphaBetaAgent with depth {depth} and time limit {time_limit}")
                     elif agent == "AlphaBeta (Full Search)":
                         players.append(AlphaBetaPlayer(depth=float('inf'), 
                                                                time_limit=float('inf'), 
-                                                               name='AlphaBetaAgent_FullSearch'))
+                                                               name='AlphaBetaAgent_FullSearch',
+                                                               ponder=ponder))
                         print("Created AlphaBetaAgent with full search (depth and time limit set to infinity)")
                     elif agent == "MCTS":
                         iterations = ai_settings["MCTS Iterations"]
                         time_limit = ai_settings["MCTS Time Limit"]
                         players.append(MCTSPlayer(iterations=iterations, 
                                                   time_limit=time_limit, 
-                                                  name=f'MCTSAgent_I{iterations}_T{time_limit}'))
+                                                  name=f'MCTSAgent_I{iterations}_T{time_limit}',
+                                                  ponder=ponder))
                         print(f"Created MCTSAgent with {iterations} iterations and time limit {time_limit}")
                     print(f"Player added: {players[-1].name}")  # 新增日志
 
                 print(f"All players created: {[player.name for player in players]}")  # 新增日志
 
-                all_stats = {player.name: {'total_time': 0, 'total_moves': 0, 'total_cpu': 0, 'wins': 0, 'losses': 0, 'draws': 0} for player in players}
-                total_games = 0
+                stats = TournamentStats.resume(STATS_CHECKPOINT_PATH) if resume else TournamentStats(STATS_CHECKPOINT_PATH)
 
                 for player1, player2 in itertools.combinations(players, 2):
                     if program_should_exit:
                         break
                     print(f"\nStarting match: {player1.name} vs {player2.name}")
-                    results, player_stats = ai_vs_ai(player1, player2)
+                    pair = (player1.name, player2.name)
+
+                    def on_game(game_num, x_name, winner, move_times, move_cpus, pair=pair):
+                        stats.add_game(pair, game_num, x_name, winner, move_times, move_cpus)
+
+                    results, player_stats = ai_vs_ai(player1, player2, record_path=GAME_RECORDS_PATH,
+                                                     completed=stats.completed(*pair), on_game=on_game)
+                    # 每场比赛结束（或窗口被关闭）都保存进度，已完成的局不会丢失
+                    stats.checkpoint()
                     if results is None:
                         print("User closed the game window")
                         break
-                    
-                    total_games += sum(results.values())
-                    
-                    # 更新统计信息
-                    for player_name, stats in player_stats.items():
-                        all_stats[player_name]['total_time'] += stats['total_time']
-                        all_stats[player_name]['total_moves'] += stats['total_moves']
-                        all_stats[player_name]['total_cpu'] += stats['total_cpu']
-
-                    all_stats[player1.name]['wins'] += results['X']
-                    all_stats[player1.name]['losses'] += results['O']
-                    all_stats[player1.name]['draws'] += results['Draw']
-                    all_stats[player2.name]['wins'] += results['O']
-                    all_stats[player2.name]['losses'] += results['X']
-                    all_stats[player2.name]['draws'] += results['Draw']
-
-                    # 打印本次对战的胜率
+
+                    # 打印本次对战的胜率（包括从检查点恢复的对局）
+                    match = stats.pair(*pair)
+                    wins, losses, draws = match['wins'], match['losses'], match['draws']
                     print(f"\nMatch results: {player1.name} vs {player2.name}")
-                    print(f"{player1.name}: Wins: {results['X']}, Losses: {results['O']}, Draws: {results['Draw']}")
-                    print(f"{player2.name}: Wins: {results['O']}, Losses: {results['X']}, Draws: {results['Draw']}")
-                    
-                    total_games_match = sum(results.values())
+                    print(f"{player1.name}: Wins: {wins}, Losses: {losses}, Draws: {draws}")
+                    print(f"{player2.name}: Wins: {losses}, Losses: {wins}, Draws: {draws}")
+
+                    total_games_match = wins + losses + draws
                     if total_games_match > 0:
-                        print(f"{player1.name} Win Rate: {results['X'] / total_games_match:.2%}")
-                        print(f"{player2.name} Win Rate: {results['O'] / total_games_match:.2%}")
-                        print(f"Draw Rate: {results['Draw'] / total_games_match:.2%}")
+                        print(f"{player1.name} Win Rate: {wins / total_games_match:.2%}")
+                        print(f"{player2.name} Win Rate: {losses / total_games_match:.2%}")
+                        print(f"Draw Rate: {draws / total_games_match:.2%}")
+                        elo, low, high = match_elo(wins, losses, draws)
+                        print(f"{player1.name} Elo difference: {elo:+.0f} (95% CI {low:+.0f} to {high:+.0f})")
+                    # 图表随每场比赛更新
+                    write_reports(stats)
 
                 if not program_should_exit:
-                    # 计算平均值和胜率
-                    for player_name, stats in all_stats.items():
-                        if stats['total_moves'] > 0:
-                            stats['avg_time'] = stats['total_time'] / stats['total_moves']
-                            stats['avg_cpu'] = stats['total_cpu'] / stats['total_moves']
-                        else:
-                            stats['avg_time'] = 0
-                            stats['avg_cpu'] = 0
-                        
-                        total_games_player = stats['wins'] + stats['losses'] + stats['draws']
-                        if total_games_player > 0:
-                            stats['win_rate'] = stats['wins'] / total_games_player
-                            stats['loss_rate'] = stats['losses'] / total_games_player
-                            stats['draw_rate'] = stats['draws'] / total_games_player
-                        else:
-                            stats['win_rate'] = stats['loss_rate'] = stats['draw_rate'] = 0
-
-                    # 打印详细统计信息
-                    print("\nDetailed Statistics:")
-                    print(f"Total games played: {total_games}")
-                    for player_name, stats in all_stats.items():
-                        print(f"\n{player_name}:")
-                        print(f"  Wins: {stats['wins']} ({stats['win_rate']:.2%})")
-                        print(f"  Losses: {stats['losses']} ({stats['loss_rate']:.2%})")
-                        print(f"  Draws: {stats['draws']} ({stats['draw_rate']:.2%})")
-                        print(f"  Average move time: {stats['avg_time']:.4f} seconds")
-                        print(f"  Average CPU usage: {stats['avg_cpu']:.2f}%")
-
-                    # 绘制统计图表
-                    plot_stats(all_stats)
-                    plot_results(all_stats)
-                    plot_detailed_stats(all_stats)
+                    print_report(stats)
                     print("AI vs AI completed, statistics charts generated")
             else:
                 print("AI settings not confirmed or returned None. Exiting.")
@@ -322,5 +380,184 @@ def main():
     finally:
         pygame.quit()
 
+def _create_players(specs, clock=None):
+    players = []
+    for spec in specs:
+        player = create_player(spec, clock)
+        # 同类型玩家默认名字相同，用参数区分，否则 Elo 统计会混在一起
+        if 'name=' not in spec:
+            player.name = spec
+        players.append(player)
+    return players
+
+# 不打开窗口的循环赛，只用到 game/ai/player 以及 headless 中的对局循环
+# checkpoint_path 给定时定期保存统计，resume 为 True 则从已有检查点继续
+# clock 为 (总时间, 加时) 时每个搜索型玩家按各自的整局时钟分配用时
+def run_headless(specs, games=10, sprt=None, processes=None, seed=None, record_path=None,
+                 checkpoint_path=None, resume=False, clock=None):
+    from headless import round_robin
+    players = _create_players(specs, clock)
+    if len(players) < 2:
+        raise ValueError("A tournament needs at least two players")
+    if resume and checkpoint_path:
+        stats = TournamentStats.resume(checkpoint_path)
+    else:
+        stats = TournamentStats(checkpoint_path)
+    # 续跑沿用检查点里的种子；没有给种子时随机选一个并保存，之后续跑仍能得到同样的对局种子
+    if stats.seed is not None:
+        if seed is not None and seed != stats.seed:
+            raise ValueError(f"{checkpoint_path} was started with --seed {stats.seed}, not {seed}")
+        seed = stats.seed
+    elif seed is None:
+        seed = random.randrange(2 ** 32)
+    stats.seed = seed
+
+    def report(player_a, player_b, result):
+        x_name = player_a.name if result['a_is_x'] else player_b.name
+        stats.add_game((player_a.name, player_b.name), result['index'], x_name, result['winner'], result['times'])
+        print(f"{player_a.name} vs {player_b.name}: {result['winner']} "
+              f"({player_a.name} as {'X' if result['a_is_x'] else 'O'}, {len(result['moves'])} moves)", flush=True)
+
+    try:
+        matches, ratings = round_robin(players, games, sprt, processes, seed, record_path, report, stats.pairs)
+    finally:
+        if checkpoint_path:
+            stats.checkpoint()
+    print("\nDetailed Statistics:")
+    print(stats.format_report())
+    for (name_a, name_b), match in matches.items():
+        elo, low, high = match['elo']
+        print(f"\nMatch results: {name_a} vs {name_b}")
+        print(f"{name_a}: Wins: {match['wins']}, Losses: {match['losses']}, Draws: {match['draws']}")
+        print(f"{name_a} Elo difference: {elo:+.0f} (95% CI {low:+.0f} to {high:+.0f})")
+        if sprt is not None:
+            print(f"SPRT [{sprt.elo0:g}, {sprt.elo1:g}]: {match['sprt'] or 'inconclusive'} (LLR {match['llr']:+.2f})")
+    print("\nElo ratings (95% CI):")
+    for player_name, (elo, low, high) in sorted(ratings.items(), key=lambda item: -item[1][0]):
+        print(f"  {player_name}: {elo:+.0f} ({low:+.0f} to {high:+.0f})")
+    return matches, ratings
+
+# bench 测量的模块组：每组在新的解释器中导入，得到不受缓存影响的冷启动耗时
+IMPORT_GROUPS = [
+    ('main', ['main']),
+    ('engine', ['game', 'ai', 'player']),
+    ('headless', ['headless']),
+    ('gui', ['pygame', 'gui']),
+    ('plots', ['numpy', 'matplotlib.pyplot']),
+    ('metrics', ['psutil']),
+]
+
+BENCH_SPECS = ['minimax:depth=6,time_limit=inf', 'minimax:algorithm="pvs",depth=6,time_limit=inf',
+               'mcts:iterations=2000,time_limit=inf']
+# 只有搜索型玩家带 profile 参数
+BENCH_PLAYER_TYPES = ('minimax', 'alphabeta', 'mcts')
+# 空棋盘上各着法评估都是 0，剪枝情况不典型，所以从几步之后的固定局面开始测
+BENCH_MOVES = [(4, 4), (4, 0), (0, 4), (4, 8), (8, 4)]
+
+def measure_import(modules):
+    # 返回导入耗时（秒），模块未安装时返回 None
+    code = ('import time\n'
+            'start = time.perf_counter()\n'
+            + ''.join(f'import {name}\n' for name in modules) +
+            'print(time.perf_counter() - start)\n')
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.split()[-1])
+
+def run_bench(specs=None):
+    from ai import cached_evaluate
+    # 先检查所有 spec，避免测完导入耗时才报错
+    profiled = []
+    for spec in specs or BENCH_SPECS:
+        kind, _, args = spec.partition(':')
+        if kind.lower() not in BENCH_PLAYER_TYPES:
+            raise ValueError(f"Cannot benchmark {spec!r}: bench needs a search player "
+                             f"({', '.join(BENCH_PLAYER_TYPES)})")
+        profiled.append((spec, f"{kind}:{args + ',' if args else ''}profile=True"))
+
+    print("Import times (fresh interpreter):")
+    for group, modules in IMPORT_GROUPS:
+        seconds = measure_import(modules)
+        timing = f"{seconds * 1000:8.1f} ms" if seconds is not None else "  not installed"
+        print(f"  {group:<10}{timing}  ({', '.join(modules)})")
+
+    game = NineBoardTicTacToe()
+    for move in BENCH_MOVES:
+        game.make_move(*move)
+    print(f"\nSearch speed after {len(BENCH_MOVES)} moves:")
+    for spec, profiled_spec in profiled:
+        player = create_player(profiled_spec)
+        cached_evaluate.cache_clear()
+        player.get_move(game.clone())
+        trace = player.profiler.last_trace
+        if isinstance(player, MCTSPlayer):
+            nodes, unit = trace['rollouts'], 'iterations'
+        else:
+            nodes, unit = sum(trace['nodes_per_depth'].values()), 'nodes'
+        rate = nodes / trace['elapsed'] if trace['elapsed'] else 0
+        print(f"  {spec}: {nodes} {unit} in {trace['elapsed']:.3f} s ({rate:,.0f} {unit}/s)")
+
+def _parse_sprt(value):
+    elo0, _, elo1 = value.partition(',')
+    return SPRT(float(elo0), float(elo1))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Nine-Board Tic-Tac-Toe')
+    sub = parser.add_subparsers(dest='command')
+    gui = sub.add_parser('gui', help='graphical interface (default)')
+    gui.add_argument('--resume', action='store_true', help=f'continue the tournament saved in {STATS_CHECKPOINT_PATH}')
+    gui.add_argument('--ponder', action='store_true', help="AI vs AI players keep searching on the opponent's time")
+    headless = sub.add_parser('headless', help='round-robin tournament without a window')
+    headless.add_argument('agents', nargs='+', help='player specs, e.g. "mcts:iterations=500,time_limit=1"')
+    headless.add_argument('--games', type=int, default=10, help='games per pair')
+    headless.add_argument('--sprt', type=_parse_sprt, metavar='ELO0,ELO1',
+                          help='stop each match early once SPRT accepts a hypothesis')
+    headless.add_argument('--processes', type=int, help='worker processes (default: CPU count)')
+    headless.add_argument('--seed', type=int)
+    headless.add_argument('--clock', type=parse_clock, metavar='TOTAL+INC',
+                          help='per-game clock for every search player, e.g. 60+0.5 (seconds)')
+    headless.add_argument('--record', help='append finished games to this record file')
+    headless.add_argument('--checkpoint', help='save running statistics to this file')
+    headless.add_argument('--resume', action='store_true', help='skip games already stored in the checkpoint')
+    report = sub.add_parser('report', help='print statistics and redraw charts from a checkpoint')
+    report.add_argument('checkpoint', nargs='?', default=STATS_CHECKPOINT_PATH)
+    report.add_argument('--no-plots', action='store_true', help='print the text report only')
+    sub.add_parser('analyse', add_help=False, help='batch position analysis, see analysis.py')
+    sub.add_parser('serve', add_help=False, help='match server and agent clients, see server.py')
+    bench = sub.add_parser('bench', help='report import times and search speed')
+    bench.add_argument('specs', nargs='*', help='player specs to benchmark')
+    args, rest = parser.parse_known_args(argv)
+
+    # analyse 和 serve 的参数交给对应模块自己解析
+    if args.command == 'analyse':
+        import analysis
+        analysis.main(rest)
+    elif args.command == 'serve':
+        import server
+        server.main(rest)
+    elif rest:
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+    elif args.command == 'headless':
+        try:
+            run_headless(args.agents, args.games, args.sprt, args.processes, args.seed, args.record,
+                         args.checkpoint, args.resume, args.clock)
+        except ValueError as e:
+            headless.error(str(e))
+    elif args.command == 'report':
+        stats = TournamentStats.load(args.checkpoint)
+        print_report(stats)
+        if not args.no_plots:
+            write_reports(stats)
+    elif args.command == 'bench':
+        try:
+            run_bench(args.specs)
+        except ValueError as e:
+            bench.error(str(e))
+    else:
+        run_gui(getattr(args, 'resume', False), getattr(args, 'ponder', False))
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
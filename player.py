@@ -1,8 +1,14 @@
 # player.py
 import random
 import time
-from ai import minimax_depth_limited, mcts
+import threading
+import ast
+from ai import minimax_depth_limited, pvs, mcts, mcts_search, best_child, find_subtree, MCTSNode, SearchAborted, cached_evaluate, TreeBudget
 from functools import lru_cache
+from profiler import SearchProfiler
+from ponder import Ponderer
+from ttable import SharedTranspositionTable
+from timecontrol import TimeControl, parse_clock
 
 class RandomPlayer:
     def __init__(self, name='Random'):
@@ -13,45 +19,343 @@ class RandomPlayer:
         return random.choice(moves) if moves else None
 
 class MinimaxPlayer:
-    def __init__(self, depth=3, time_limit=5, name='Minimax'):
+    def __init__(self, depth=3, time_limit=5, name='Minimax', profile=False, profile_sample=False, ponder=False,
+                 time_control=None, algorithm='minimax', aspiration_window=2, tt_path=None, tt_entries=1 << 20,
+                 profile_path=None):
         self.max_depth = depth
         self.time_limit = time_limit
         self.name = name
+        # algorithm 为 'minimax' 或 'pvs'；pvs 在迭代加深时以上一层的分数设置期望窗口
+        if algorithm not in ('minimax', 'pvs'):
+            raise ValueError(f"Unknown search algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.aspiration_window = aspiration_window
+        # tt_path 指定共享置换表文件（仅 pvs 使用），同机的所有进程和之后的运行都会复用其中的结果
+        self.tt_path = tt_path
+        self.tt_entries = tt_entries
+        self._tt = None
+        # time_control 为 TimeControl 时按整局时钟分配每步用时，time_limit 不再使用
+        self.time_control = time_control
+        # profile 开启计数和计时，profile_sample 额外用 cProfile 采样，profile_path 把每次搜索的记录追加到该 JSON Lines 文件
+        self.profiler = _create_profiler(profile, profile_sample, profile_path)
+        # ponder 开启后在对手思考时继续搜索预测的局面
+        self.ponder = ponder
+        self.ponder_hits = 0
+        self._ponderer = Ponderer()
+        self._ponder_results = {}
+        self.completed_depth = 0
 
     def get_move(self, game):
         start_time = time.time()
+        self.stop_pondering()
+        start_depth = 1
         best_move = None
-        if self.max_depth == float('inf'):
+        # 如果对手走了预测的那一步，从后台已完成的深度继续加深
+        known = self._ponder_results.get(game.key())
+        self._ponder_results = {}
+        if known is not None:
+            done_depth, best_move = known
+            start_depth = done_depth + 1
+            self.ponder_hits += 1
+
+        # 只有一个合法落子时不必搜索
+        moves = game.get_valid_moves()
+        if len(moves) == 1:
+            return self._finish(moves[0], start_time)
+
+        tc = self.time_control
+        time_limit = self.time_limit
+        stop = timer = None
+        if tc is not None:
+            base, maximum = tc.budget(game, moves)
+            time_limit = base
+            changes = 0
+            # 超过最长用时立即中断当前深度，使用上一层的结果
+            stop = threading.Event()
+            timer = threading.Timer(maximum, stop.set)
+            timer.start()
+        elif known is not None and time_limit != float('inf'):
+            # 从后台结果继续时第一层就比平时深，耗时可能是普通一步的许多倍，
+            # 到 time_limit 就中断，使用后台已经算出的着法
+            stop = threading.Event()
+            timer = threading.Timer(time_limit, stop.set)
+            timer.start()
+
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.begin_search(self.name)
+            cache_before = cached_evaluate.cache_info()
+        depth = start_depth
+        score = None
+        # 最后一层完整搜索完的深度
+        self.completed_depth = start_depth - 1
+        while depth <= self.max_depth:
+            try:
+                score, move = self._search(game, depth, score, profiler, stop)
+            except SearchAborted:
+                break
+            self.completed_depth = depth
+            if move:
+                if tc is not None and best_move is not None and move != best_move:
+                    changes += 1
+                    time_limit = tc.extend(base, maximum, min(1.0, changes * 0.5))
+                best_move = move
+            elapsed = time.time() - start_time
+            if elapsed > time_limit:
+                break
+            # 下一层的耗时通常是这一层的数倍，剩余时间不够就不再开始
+            if tc is not None and elapsed > time_limit / 2:
+                break
+            depth += 1
+        if timer is not None:
+            timer.cancel()
+        if profiler is not None:
+            _count_cache(profiler, cache_before)
+            profiler.end_search(depth=self.completed_depth, move=best_move)
+
+        if best_move is None and moves:
+            best_move = moves[0]
+        if self.ponder and best_move:
+            after = game.clone()
+            after.make_move(*best_move)
+            if not after.is_terminal():
+                self._ponderer.start(self._ponder, after)
+        return self._finish(best_move, start_time)
+
+    # pv 为列表时写入本次搜索的主变例
+    def _search(self, game, depth, guess=None, profiler=None, stop=None, pv=None):
+        if self.algorithm == 'minimax':
+            return minimax_depth_limited(game, depth, game.current_player == 'X', profiler=profiler, stop=stop, pv=pv)
+        color = 1 if game.current_player == 'X' else -1
+        if guess is None or self.aspiration_window is None:
+            return pvs(game, depth, -float('inf'), float('inf'), color, profiler, stop, tt=self.transposition_table(),
+                       pv=pv)
+        # 期望窗口：落在窗口外时只放开失败的一侧重新搜索
+        alpha = guess - self.aspiration_window
+        beta = guess + self.aspiration_window
+        while True:
+            attempt = [] if pv is not None else None
+            score, move = pvs(game, depth, alpha, beta, color, profiler, stop, tt=self.transposition_table(),
+                              pv=attempt)
+            if score <= alpha:
+                alpha = -float('inf')
+            elif score >= beta:
+                beta = float('inf')
+            else:
+                if pv is not None:
+                    pv[:] = attempt
+                return score, move
+            if profiler is not None:
+                profiler.count('aspiration_fails')
+
+    def transposition_table(self):
+        # 第一次搜索时才打开，进程池里的每个副本各自映射同一个文件
+        if self._tt is None and self.tt_path is not None:
+            self._tt = SharedTranspositionTable(self.tt_path, self.tt_entries)
+        return self._tt
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_tt'] = None
+        return state
+
+    def _finish(self, move, start_time):
+        if self.time_control is not None:
+            self.time_control.consume(time.time() - start_time)
+        return move
+
+    def new_game(self):
+        self.stop_pondering()
+        self._ponder_results = {}
+        if self.time_control is not None:
+            self.time_control.new_game()
+
+    def stop_pondering(self):
+        self._ponderer.stop()
+
+    def _ponder(self, stop, game):
+        try:
+            # 先预测对手的应着，再对预测局面做迭代加深
+            reply = None
+            for depth in range(1, max(1, min(self.max_depth - 1, 3)) + 1):
+                _, move = self._search(game, depth, stop=stop)
+                if move:
+                    reply = move
+            if reply is None:
+                return
+            game = game.clone()
+            game.make_move(*reply)
+            if game.is_terminal():
+                return
+            key = game.key()
             depth = 1
-            while time.time() - start_time < self.time_limit:
-                _, move = minimax_depth_limited(game, depth, game.current_player == 'X')
+            while depth <= self.max_depth:
+                _, move = self._search(game, depth, stop=stop)
                 if move:
-                    best_move = move
+                    self._ponder_results[key] = (depth, move)
                 depth += 1
-        else:
-            for depth in range(1, self.max_depth + 1):
-                _, move = minimax_depth_limited(game, depth, game.current_player == 'X')
-                if move:
-                    best_move = move
-                if time.time() - start_time > self.time_limit:
-                    break
-        return best_move
+        except SearchAborted:
+            pass
 
 # AlphaBetaPlayer 现在是 MinimaxPlayer 的别名
 AlphaBetaPlayer = MinimaxPlayer
 
 class MCTSPlayer:
-    def __init__(self, iterations=1000, time_limit=5, name='MCTS'):
+    def __init__(self, iterations=1000, time_limit=5, name='MCTS', profile=False, profile_sample=False, ponder=False,
+                 time_control=None, solver=False, rave=False, rave_k=500, max_nodes=None, memory_limit=None,
+                 prune=True, profile_path=None):
         self.iterations = iterations
         self.time_limit = time_limit
         self.name = name
+        self.time_control = time_control
+        # solver 传播已证明的胜负，rave 让模拟中下过的格子分享结果（rave_k 为等价访问次数）
+        self.solver = solver
+        self.rave_k = rave_k if rave else 0
+        # 搜索树的节点数或内存（字节）上限，超出后回收冷门子树（prune=False 时停止扩展）
+        # budget.nodes 和 budget.bytes 是最近一次搜索结束时的树大小
+        self.budget = TreeBudget(max_nodes, memory_limit, prune) if max_nodes or memory_limit else None
+        self.profiler = _create_profiler(profile, profile_sample, profile_path)
+        self.ponder = ponder
+        self.ponder_hits = 0
+        self._ponderer = Ponderer()
+        self._tree = None
 
     def get_move(self, game):
-        return mcts(game, self.iterations, self.time_limit)
+        start_time = time.time()
+        moves = game.get_valid_moves()
+        if len(moves) == 1:
+            self.stop_pondering()
+            self._tree = None
+            return self._finish(moves[0], start_time)
+
+        profiler = self.profiler
+        if not self.ponder and self.time_control is None:
+            if profiler is None:
+                return mcts(game, self.iterations, self.time_limit, solver=self.solver, rave_k=self.rave_k,
+                            budget=self.budget)
+            profiler.begin_search(self.name)
+            cache_before = cached_evaluate.cache_info()
+            move = mcts(game, self.iterations, self.time_limit, profiler, self.solver, self.rave_k, self.budget)
+            _count_cache(profiler, cache_before)
+            profiler.end_search(move=move)
+            return move
+
+        # 复用后台思考时扩展出的子树
+        self.stop_pondering()
+        root = find_subtree(self._tree, game) if self._tree is not None else None
+        self._tree = None
+        if root is not None:
+            self.ponder_hits += 1
+        else:
+            root = MCTSNode(game.clone())
+        if profiler is not None:
+            profiler.begin_search(self.name)
+            cache_before = cached_evaluate.cache_info()
+        if self.time_control is None:
+            self._search(root, self.iterations, self.time_limit, profiler)
+        else:
+            self._timed_search(root, moves, profiler, start_time)
+        child = best_child(root, self.solver)
+        if profiler is not None:
+            _count_cache(profiler, cache_before)
+            profiler.end_search(move=child.move, root_visits=root.visits)
+        if self.ponder and not child.game.is_terminal():
+            child.parent = None
+            self._tree = child
+            self._ponderer.start(self._ponder, child)
+        return self._finish(child.move, start_time)
+
+    def _timed_search(self, root, moves, profiler, start_time):
+        tc = self.time_control
+        base, maximum = tc.budget(root.game, moves)
+        start_visits = root.visits
+        self._search(root, self.iterations, base - (time.time() - start_time), profiler)
+        # 前两名访问次数接近时分批追加搜索，直到拉开差距或用完最长用时
+        while True:
+            done = root.visits - start_visits
+            target = tc.extend(base, maximum, _instability(root))
+            left = target - (time.time() - start_time)
+            if done >= self.iterations or left <= 0.01 or (self.solver and root.proven is not None):
+                break
+            self._search(root, self.iterations - done, min(left, max(base / 4, 0.01)), profiler)
+
+    def _finish(self, move, start_time):
+        if self.time_control is not None:
+            self.time_control.consume(time.time() - start_time)
+        return move
+
+    def new_game(self):
+        self.stop_pondering()
+        self._tree = None
+        if self.time_control is not None:
+            self.time_control.new_game()
+
+    def stop_pondering(self):
+        self._ponderer.stop()
+
+    def _search(self, root, iterations, time_limit, profiler=None, stop=None):
+        return mcts_search(root, iterations, time_limit, profiler, stop, self.solver, self.rave_k, self.budget)
+
+    def _ponder(self, stop, root):
+        self._search(root, self.iterations, float('inf'), stop=stop)
+
+# 访问次数最多的两个子节点差距越小越不稳定，返回 0~1
+def _instability(root, margin=0.1):
+    if len(root.children) < 2:
+        return 0.0
+    first, second = sorted((c.visits for c in root.children), reverse=True)[:2]
+    if first == 0:
+        return 1.0
+    return max(0.0, 1 - (first - second) / first / margin)
+
+def _create_profiler(profile, profile_sample, profile_path):
+    if profile or profile_sample or profile_path:
+        return SearchProfiler(sample=profile_sample, path=profile_path)
+    return None
+
+# 评估缓存 cached_evaluate 的命中情况
+def _count_cache(profiler, before):
+    after = cached_evaluate.cache_info()
+    hits = after.hits - before.hits
+    profiler.count('eval_cache_probes', hits + after.misses - before.misses)
+    profiler.count('eval_cache_hits', hits)
 
 class HumanPlayer:
     def __init__(self, name='Human'):
         self.name = name
 
     def get_move(self, game):
-        return None  # 人类玩家的移动在GUI中处理
\ No newline at end of file
+        return None  # 人类玩家的移动在GUI中处理
+
+PLAYER_TYPES = {
+    'random': RandomPlayer,
+    'minimax': MinimaxPlayer,
+    'alphabeta': AlphaBetaPlayer,
+    'mcts': MCTSPlayer,
+}
+
+# 从字符串创建玩家，例如 "mcts:iterations=500,time_limit=1,rave=True"
+# 供命令行和独立进程中的客户端使用
+# 整局时钟写作 time_control=60+0.5（总时间+每步加时，秒）；clock 为 (总时间, 加时) 时
+# 给没有指定 time_control 的搜索型玩家各建一个时钟
+def create_player(spec, clock=None):
+    kind, _, args = spec.partition(':')
+    if kind.lower() not in PLAYER_TYPES:
+        raise ValueError(f"Unknown player type: {kind}")
+    params = {}
+    for item in filter(None, args.split(',')):
+        key, _, value = item.partition('=')
+        key, value = key.strip(), value.strip()
+        try:
+            params[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            # 'inf' 这类 literal_eval 不认识的数值，以及不带引号的字符串
+            try:
+                params[key] = float(value)
+            except ValueError:
+                params[key] = value
+    if 'time_control' in params:
+        params['time_control'] = TimeControl(*parse_clock(params['time_control']))
+    elif clock is not None and kind.lower() != 'random':
+        params['time_control'] = TimeControl(*clock)
+    return PLAYER_TYPES[kind.lower()](**params)
@@ -0,0 +1,31 @@
+# ponder.py
+import threading
+
+# 后台思考线程：我方落子后继续搜索，对手落子时停止并交还结果
+class Ponderer:
+    def __init__(self):
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self, target, *args):
+        self.stop()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=target, args=(self._stop,) + args, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def active(self):
+        return self._thread is not None
+
+    # 线程对象不能被序列化，进程池中的副本从空闲状态开始
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
@@ -0,0 +1,99 @@
+# profiler.py
+import cProfile
+import io
+import json
+import pstats
+import time
+from collections import defaultdict
+
+# 搜索性能分析器：只有玩家开启 profile 时才会创建，
+# 热路径上只需判断 profiler 是否为 None，关闭时几乎没有开销
+# 内存中只保留累计数据和最近一次搜索的记录；给定 path 时每次搜索结束把记录追加为一行 JSON
+class SearchProfiler:
+    def __init__(self, sample=False, sort_by='cumulative', top=25, path=None):
+        self.sample = sample
+        self.sort_by = sort_by
+        self.top = top
+        self.path = path
+        self.last_trace = None
+        self.totals = defaultdict(float)
+        self.reset()
+
+    def reset(self):
+        # 单次搜索的统计数据
+        self.counters = defaultdict(int)
+        self.timers = defaultdict(float)
+        self.nodes_per_depth = defaultdict(int)
+        self.rollout_lengths = []
+        self.values = {}
+        self._profile = None
+        self._start = None
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def add_time(self, name, seconds):
+        self.timers[name] += seconds
+
+    def note(self, name, value):
+        self.values[name] = value
+
+    def visit(self, depth):
+        self.nodes_per_depth[depth] += 1
+
+    def rollout(self, length):
+        self.rollout_lengths.append(length)
+
+    def begin_search(self, player_name=None):
+        self.reset()
+        self.player_name = player_name
+        if self.sample:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self._start = time.perf_counter()
+
+    def end_search(self, **info):
+        elapsed = time.perf_counter() - self._start
+        if self._profile is not None:
+            self._profile.disable()
+        trace = self.summary(elapsed)
+        trace.update(info)
+        if self._profile is not None:
+            stream = io.StringIO()
+            pstats.Stats(self._profile, stream=stream).sort_stats(self.sort_by).print_stats(self.top)
+            trace['pstats'] = stream.getvalue()
+            self._profile = None
+        self.last_trace = trace
+        if self.path is not None:
+            self.write_trace(trace)
+        self.totals['searches'] += 1
+        self.totals['time'] += elapsed
+        for name, value in self.counters.items():
+            self.totals[name] += value
+        for name, value in self.timers.items():
+            self.totals[name + '_time'] += value
+        return trace
+
+    def summary(self, elapsed):
+        probes = self.counters.get('tt_probes', 0)
+        eval_probes = self.counters.get('eval_cache_probes', 0)
+        rollouts = self.rollout_lengths
+        return {
+            'player': self.player_name,
+            'elapsed': elapsed,
+            'counters': dict(self.counters),
+            'values': dict(self.values),
+            'timers': dict(self.timers),
+            'nodes_per_depth': {str(d): n for d, n in sorted(self.nodes_per_depth.items())},
+            'cutoffs': self.counters.get('cutoffs', 0),
+            'tt_hit_rate': self.counters.get('tt_hits', 0) / probes if probes else None,
+            'eval_cache_hit_rate': self.counters.get('eval_cache_hits', 0) / eval_probes if eval_probes else None,
+            'rollouts': len(rollouts),
+            'avg_rollout_length': sum(rollouts) / len(rollouts) if rollouts else None,
+            'max_rollout_length': max(rollouts) if rollouts else None,
+        }
+
+    # 以追加模式整行一次写入，headless 的多个进程可以共用一个文件
+    def write_trace(self, trace, path=None):
+        with open(path or self.path, 'a') as f:
+            f.write(json.dumps(trace) + '\n')
@@ -0,0 +1,98 @@
+# rating.py
+import math
+
+ELO_SCALE = 400 / math.log(10)
+
+def expected_score(elo_diff):
+    return 1 / (1 + 10 ** (-elo_diff / 400))
+
+def elo_from_score(score):
+    # 全胜或全负时 Elo 为无穷，这里截断到 ±1200（得分率 0.1% 或 99.9%）
+    score = min(max(score, 1e-3), 1 - 1e-3)
+    return -400 * math.log10(1 / score - 1)
+
+# 每局得分的均值和方差（胜 1、和 0.5、负 0）
+def score_stats(wins, losses, draws):
+    n = wins + losses + draws
+    if n == 0:
+        return 0.5, 0.0
+    mu = (wins + 0.5 * draws) / n
+    var = (wins * (1 - mu) ** 2 + draws * (0.5 - mu) ** 2 + losses * mu ** 2) / n
+    return mu, var
+
+# 全胜、全负或全和时样本方差为 0，检验和置信区间都会失效
+# 与 BayesElo 的先验类似，计算方差时加入 prior 局虚拟对局（一半算胜、一半算负）
+def regularised_var(wins, losses, draws, prior=1):
+    return score_stats(wins + prior / 2, losses + prior / 2, draws)[1]
+
+# 一组对局的 Elo 差及置信区间（默认 95%）
+def match_elo(wins, losses, draws, z=1.96):
+    n = wins + losses + draws
+    mu = score_stats(wins, losses, draws)[0]
+    if n == 0:
+        return 0.0, -float('inf'), float('inf')
+    var = regularised_var(wins, losses, draws)
+    margin = z * math.sqrt(var / n)
+    return elo_from_score(mu), elo_from_score(mu - margin), elo_from_score(mu + margin)
+
+# 序贯概率比检验：H0 为 Elo 差等于 elo0，H1 为等于 elo1
+# 对数似然比使用三项分布（胜/和/负）的正态近似，一旦越过边界即可停止比赛
+class SPRT:
+    def __init__(self, elo0=0, elo1=20, alpha=0.05, beta=0.05):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.alpha = alpha
+        self.beta = beta
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+
+    def llr(self, wins, losses, draws):
+        n = wins + losses + draws
+        if n == 0:
+            return 0.0
+        mu = score_stats(wins, losses, draws)[0]
+        var = regularised_var(wins, losses, draws)
+        s0 = expected_score(self.elo0)
+        s1 = expected_score(self.elo1)
+        return n * (s1 - s0) * (2 * mu - s0 - s1) / (2 * var)
+
+    def status(self, wins, losses, draws):
+        llr = self.llr(wins, losses, draws)
+        if llr >= self.upper:
+            return 'H1'
+        if llr <= self.lower:
+            return 'H0'
+        return None
+
+# 循环赛整体评分：Bradley-Terry 最大似然（和棋记为各半局胜），用 MM 迭代求解
+# 与 BayesElo 一样给每对选手加上 prior 局虚拟和棋，避免全胜时评分发散
+# pair_results: {(a, b): (a 胜, b 胜, 和)}；返回 {name: (elo, 下界, 上界)}，平均分为 0
+def round_robin_elo(pair_results, prior=2, iterations=200, z=1.96):
+    names = sorted({name for pair in pair_results for name in pair})
+    games = {name: {} for name in names}
+    points = {name: 0.0 for name in names}
+    for (a, b), (wins_a, wins_b, draws) in pair_results.items():
+        n = wins_a + wins_b + draws + prior
+        games[a][b] = games[a].get(b, 0) + n
+        games[b][a] = games[b].get(a, 0) + n
+        points[a] += wins_a + 0.5 * (draws + prior)
+        points[b] += wins_b + 0.5 * (draws + prior)
+
+    gamma = {name: 1.0 for name in names}
+    for _ in range(iterations):
+        new = {}
+        for name in names:
+            denom = sum(n / (gamma[name] + gamma[other]) for other, n in games[name].items())
+            new[name] = points[name] / denom if denom else 1.0
+        mean_log = sum(math.log(g) for g in new.values()) / len(new)
+        gamma = {name: g / math.exp(mean_log) for name, g in new.items()}
+
+    ratings = {}
+    for name in names:
+        elo = ELO_SCALE * math.log(gamma[name])
+        # Fisher 信息给出的标准误
+        info = sum(n * gamma[name] * gamma[other] / (gamma[name] + gamma[other]) ** 2
+                   for other, n in games[name].items())
+        margin = z * ELO_SCALE / math.sqrt(info) if info else float('inf')
+        ratings[name] = (elo, elo - margin, elo + margin)
+    return ratings
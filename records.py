@@ -0,0 +1,164 @@
+# records.py
+import json
+import mmap
+import os
+import struct
+from game import NineBoardTicTacToe
+
+# 对局记录文件格式
+# 数据文件：文件头 MAGIC，之后依次追加每局的记录
+#   记录头 <IHB：元数据长度、步数、结果；元数据为 JSON（双方名字、参数、随机种子等）
+#   走法：每步一个字节 board * 9 + cell；用时：每步一个 float32（秒）
+# 索引文件（数据文件名 + '.idx'）：每局一条 <QHB：记录偏移、步数、结果
+#   筛选步数和结果时只需读索引，不必解析数据文件
+MAGIC = b'NBTR\x01'
+RECORD_HEADER = struct.Struct('<IHB')
+INDEX_ENTRY = struct.Struct('<QHB')
+
+RESULT_CODES = {'Draw': 0, 'X': 1, 'O': 2, None: 255}
+RESULT_NAMES = {code: name for name, code in RESULT_CODES.items()}
+
+class GameRecord:
+    def __init__(self, players, params=None, seed=None, moves=None, times=None, result=None, extra=None):
+        self.players = players
+        self.params = params or {}
+        self.seed = seed
+        self.moves = moves if moves is not None else []
+        self.times = times if times is not None else []
+        self.result = result
+        self.extra = extra or {}
+
+    def add_move(self, move, elapsed):
+        self.moves.append(tuple(move))
+        self.times.append(elapsed)
+
+    def encode(self):
+        meta = json.dumps({'players': self.players, 'params': self.params, 'seed': self.seed,
+                           'extra': self.extra}).encode()
+        moves = bytes(board * 9 + cell for board, cell in self.moves)
+        times = struct.pack(f'<{len(self.times)}f', *self.times)
+        return RECORD_HEADER.pack(len(meta), len(self.moves), RESULT_CODES[self.result]) + meta + moves + times
+
+    @classmethod
+    def decode(cls, buffer, offset=0):
+        meta_len, n_moves, result = RECORD_HEADER.unpack_from(buffer, offset)
+        pos = offset + RECORD_HEADER.size
+        meta = json.loads(bytes(buffer[pos:pos + meta_len]))
+        pos += meta_len
+        moves = [divmod(code, 9) for code in buffer[pos:pos + n_moves]]
+        pos += n_moves
+        times = list(struct.unpack_from(f'<{n_moves}f', buffer, pos))
+        return cls(meta['players'], meta['params'], meta['seed'], moves, times, RESULT_NAMES[result], meta['extra'])
+
+    def replay(self, upto=None):
+        game = NineBoardTicTacToe()
+        for move in self.moves[:upto]:
+            game.make_move(*move)
+        return game
+
+# 只保留玩家对象里可以写进 JSON 的简单参数
+def player_params(player):
+    return {key: value for key, value in vars(player).items()
+            if not key.startswith('_') and isinstance(value, (bool, int, float, str))}
+
+class RecordWriter:
+    def __init__(self, path):
+        self.path = path
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._data = open(path, 'ab')
+        self._index = open(path + '.idx', 'ab')
+        if new_file:
+            self._data.write(MAGIC)
+
+    def append(self, record):
+        offset = self._data.tell()
+        self._data.write(record.encode())
+        self._index.write(INDEX_ENTRY.pack(offset, len(record.moves), RESULT_CODES[record.result]))
+        # 每局写完就落盘，程序中途退出也不会丢失已完成的对局
+        self._data.flush()
+        self._index.flush()
+        return offset
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# 用 mmap 读取记录文件，按需解析单局，适合上百万局的文件
+class RecordReader:
+    def __init__(self, path):
+        self.path = path
+        self._data_file = open(path, 'rb')
+        self._index_file = open(path + '.idx', 'rb')
+        self._data = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a game record file: {path}")
+        index_size = os.fstat(self._index_file.fileno()).st_size
+        # 只读取完整写入的索引项
+        self._count = index_size // INDEX_ENTRY.size
+        self._index = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ) if self._count else b''
+
+    def __len__(self):
+        return self._count
+
+    def entry(self, i):
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return INDEX_ENTRY.unpack_from(self._index, i * INDEX_ENTRY.size)
+
+    def __getitem__(self, i):
+        offset, _, _ = self.entry(i)
+        return GameRecord.decode(self._data, offset)
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+    def result(self, i):
+        return RESULT_NAMES[self.entry(i)[2]]
+
+    def moves(self, i):
+        # 直接返回 mmap 中走法字节的只读视图，不复制
+        offset, n_moves, _ = self.entry(i)
+        meta_len = RECORD_HEADER.unpack_from(self._data, offset)[0]
+        start = offset + RECORD_HEADER.size + meta_len
+        return memoryview(self._data)[start:start + n_moves]
+
+    def filter(self, result=None, min_moves=None, max_moves=None, predicate=None):
+        # 先用索引筛选结果和步数，只有给了 predicate 才解析整条记录
+        for i in range(self._count):
+            _, n_moves, code = self.entry(i)
+            if result is not None and RESULT_NAMES[code] != result:
+                continue
+            if min_moves is not None and n_moves < min_moves:
+                continue
+            if max_moves is not None and n_moves > max_moves:
+                continue
+            if predicate is not None and not predicate(self[i]):
+                continue
+            yield i
+
+    def replay(self, i, upto=None):
+        game = NineBoardTicTacToe()
+        for code in self.moves(i)[:upto]:
+            game.make_move(code // 9, code % 9)
+        return game
+
+    def close(self):
+        if isinstance(self._index, mmap.mmap):
+            self._index.close()
+        self._data.close()
+        self._index_file.close()
+        self._data_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
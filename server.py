@@ -0,0 +1,313 @@
+# server.py
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import time
+from game import NineBoardTicTacToe
+from records import GameRecord, RecordWriter
+from timecontrol import parse_clock
+
+# 本地对局服务器：每个智能体是一个独立进程，通过 TCP 或 Unix socket 连接
+# 协议为每行一个 JSON 对象：
+#   客户端 -> 服务器  {"type": "hello", "name": ...}
+#                     {"type": "move", "game_id": ..., "ply": ..., "move": [board, cell]}
+#   服务器 -> 客户端  {"type": "start", "game_id": ..., "side": "X"/"O", "opponent": ...}
+#                     {"type": "move_request", "game_id": ..., "ply": ..., "moves": [...], "deadline": 秒}
+#                     {"type": "game_over", "game_id": ..., "winner": ..., "reason": ...}
+# 服务器只负责规则和计时：超时、非法着法或断线都判负，所以一个慢或崩溃的智能体不会拖住其他对局
+
+def _encode(message):
+    return (json.dumps(message) + '\n').encode()
+
+class Connection:
+    def __init__(self, reader, writer, name, connection_id):
+        self.reader = reader
+        self.writer = writer
+        self.name = name
+        self.id = connection_id
+        self.closed = asyncio.get_running_loop().create_future()
+        self.games_played = 0
+
+    async def send(self, message):
+        self.writer.write(_encode(message))
+        await self.writer.drain()
+
+    async def receive(self):
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError(f"{self.name} disconnected")
+        return json.loads(line)
+
+    def close(self):
+        if not self.closed.done():
+            self.closed.set_result(None)
+        self.writer.close()
+
+class MatchServer:
+    def __init__(self, move_time=5.0, grace=0.5, max_games=None, record_path=None, on_result=None):
+        self.move_time = move_time
+        self.grace = grace
+        self.max_games = max_games
+        self.on_result = on_result
+        self.results = []
+        self.active_games = 0
+        self._writer = RecordWriter(record_path) if record_path else None
+        self._game_ids = itertools.count(1)
+        self._connection_ids = itertools.count(1)
+        # 每对连接之间已开始的局数，用于交替执先
+        self._pair_games = {}
+        # 事件循环只保留任务的弱引用，进行中的对局任务要自己保存，否则可能被回收
+        self._games = set()
+        self._started = 0
+        self._waiting = None
+        self._server = None
+        self.finished = None
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        self._waiting = asyncio.Queue()
+        self.finished = asyncio.get_running_loop().create_future()
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path=path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+        self._matchmaker = asyncio.create_task(self._match_clients())
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        try:
+            await self.finished
+        finally:
+            await self.close()
+
+    async def close(self):
+        self._matchmaker.cancel()
+        self._server.close()
+        await self._server.wait_closed()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def _handle(self, reader, writer):
+        try:
+            hello = json.loads(await reader.readline() or b'{}')
+        except ValueError:
+            hello = {}
+        if not isinstance(hello, dict) or hello.get('type') != 'hello':
+            writer.close()
+            return
+        connection = Connection(reader, writer, hello.get('name', 'anonymous'), next(self._connection_ids))
+        await self._waiting.put(connection)
+        # 连接由对局任务读写，这里只等待连接结束
+        await connection.closed
+
+    async def _match_clients(self):
+        while True:
+            first = await self._waiting.get()
+            second = await self._waiting.get()
+            if first.closed.done():
+                await self._requeue(second)
+                continue
+            if second.closed.done():
+                await self._requeue(first)
+                continue
+            if self.max_games is not None and self._started >= self.max_games:
+                first.close()
+                second.close()
+                continue
+            self._started += 1
+            # 同一对连接每局交换先后手：偶数局由 id 小的一方执 X
+            if first.id > second.id:
+                first, second = second, first
+            pair = (first.id, second.id)
+            played = self._pair_games.get(pair, 0)
+            self._pair_games[pair] = played + 1
+            if played % 2:
+                first, second = second, first
+            task = asyncio.create_task(self._play(first, second))
+            self._games.add(task)
+            task.add_done_callback(self._games.discard)
+
+    async def _requeue(self, connection):
+        if connection.closed.done():
+            return
+        if self.max_games is not None and self._started >= self.max_games:
+            connection.close()
+        else:
+            await self._waiting.put(connection)
+
+    async def _play(self, x_conn, o_conn):
+        game_id = next(self._game_ids)
+        self.active_games += 1
+        game = NineBoardTicTacToe()
+        conns = {'X': x_conn, 'O': o_conn}
+        moves = []
+        times = []
+        winner = None
+        reason = 'normal'
+        try:
+            for side, conn in conns.items():
+                opponent = conns['O' if side == 'X' else 'X']
+                await conn.send({'type': 'start', 'game_id': game_id, 'side': side, 'opponent': opponent.name,
+                                 'move_time': self.move_time})
+            while not game.game_over:
+                side = game.current_player
+                conn = conns[side]
+                start_time = time.time()
+                await conn.send({'type': 'move_request', 'game_id': game_id, 'ply': len(moves),
+                                 'moves': moves, 'deadline': self.move_time})
+                move = await self._receive_move(conn, game_id, len(moves), start_time)
+                if move is None:
+                    reason = 'timeout'
+                elif not _is_move(move) or tuple(move) not in game.get_valid_moves():
+                    reason = 'illegal'
+                if reason != 'normal':
+                    winner = 'O' if side == 'X' else 'X'
+                    break
+                times.append(time.time() - start_time)
+                game.make_move(*move)
+                moves.append(list(move))
+            else:
+                winner = game.winner
+        except (ConnectionError, OSError, ValueError):
+            # 断线的一方判负
+            reason = 'disconnect'
+            winner = 'O' if game.current_player == 'X' else 'X'
+            conns[game.current_player].close()
+        finally:
+            self.active_games -= 1
+
+        result = {'game_id': game_id, 'X': x_conn.name, 'O': o_conn.name, 'winner': winner,
+                  'reason': reason, 'moves': moves, 'times': times}
+        self._finish(result)
+        for conn in conns.values():
+            conn.games_played += 1
+            if conn.closed.done():
+                continue
+            try:
+                await conn.send({'type': 'game_over', 'game_id': game_id, 'winner': winner, 'reason': reason})
+            except (ConnectionError, OSError):
+                conn.close()
+                continue
+            await self._requeue(conn)
+
+    async def _receive_move(self, conn, game_id, ply, start_time):
+        # 超时返回 None；之前超时留下的过期回复直接丢弃
+        while True:
+            left = self.move_time + self.grace - (time.time() - start_time)
+            if left <= 0:
+                return None
+            try:
+                message = await asyncio.wait_for(conn.receive(), left)
+            except asyncio.TimeoutError:
+                return None
+            if not isinstance(message, dict):
+                # 不是 JSON 对象的回复按非法着法处理
+                return False
+            if message.get('type') == 'move' and message.get('game_id') == game_id and message.get('ply') == ply:
+                return message.get('move')
+
+    def _finish(self, result):
+        self.results.append(result)
+        if self._writer is not None:
+            self._writer.append(GameRecord({'X': result['X'], 'O': result['O']}, seed=None,
+                                           moves=[tuple(m) for m in result['moves']], times=result['times'],
+                                           result=result['winner'], extra={'reason': result['reason']}))
+        if self.on_result is not None:
+            self.on_result(result)
+        if self.max_games is not None and len(self.results) >= self.max_games and not self.finished.done():
+            self.finished.set_result(None)
+
+# 着法必须是两个 0~8 的整数；(4, 4.0) 与 (4, 4) 相等，不检查类型会混过合法性判断
+def _is_move(move):
+    return (isinstance(move, list) and len(move) == 2
+            and all(type(i) is int and 0 <= i <= 8 for i in move))
+
+# 客户端适配器：把 player.py 中的任意玩家接到服务器上
+# get_move 在线程中运行，事件循环仍能及时处理连接
+async def run_client(player, host='127.0.0.1', port=None, path=None, games=None):
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    loop = asyncio.get_running_loop()
+    writer.write(_encode({'type': 'hello', 'name': player.name}))
+    await writer.drain()
+    played = 0
+    try:
+        while games is None or played < games:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if message['type'] == 'start':
+                if hasattr(player, 'new_game'):
+                    player.new_game()
+            elif message['type'] == 'move_request':
+                game = NineBoardTicTacToe()
+                for move in message['moves']:
+                    game.make_move(*move)
+                move = await loop.run_in_executor(None, player.get_move, game)
+                writer.write(_encode({'type': 'move', 'game_id': message['game_id'], 'ply': message['ply'],
+                                      'move': list(move)}))
+                await writer.drain()
+            elif message['type'] == 'game_over':
+                if hasattr(player, 'stop_pondering'):
+                    player.stop_pondering()
+                played += 1
+    except (ConnectionError, OSError):
+        # 服务器关闭时正常退出
+        pass
+    finally:
+        writer.close()
+    return played
+
+def _client_process(spec, host, port, path, games, clock=None):
+    from player import create_player
+    asyncio.run(run_client(create_player(spec, clock), host, port, path, games))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local match server for Nine-Board Tic-Tac-Toe agents')
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve = sub.add_parser('serve', help='host games between connected agents')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--unix', help='listen on a Unix socket instead of TCP')
+    serve.add_argument('--move-time', type=float, default=5.0)
+    serve.add_argument('--games', type=int, help='stop after this many games')
+    serve.add_argument('--record', help='append finished games to this record file')
+    client = sub.add_parser('client', help='connect agent processes to a server')
+    client.add_argument('agent', help='player spec, e.g. "mcts:iterations=500,time_limit=1"')
+    client.add_argument('--host', default='127.0.0.1')
+    client.add_argument('--port', type=int, default=8765)
+    client.add_argument('--unix')
+    client.add_argument('--games', type=int, help='disconnect after this many games')
+    client.add_argument('--clients', type=int, default=1, help='number of agent processes to start')
+    client.add_argument('--clock', type=parse_clock, metavar='TOTAL+INC',
+                        help='per-game clock for the agent, e.g. 60+0.5 (seconds); keep it within --move-time')
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        def report(result):
+            print(f"game {result['game_id']}: {result['X']} (X) vs {result['O']} (O) -> "
+                  f"{result['winner']} ({result['reason']})", flush=True)
+
+        async def serve_main():
+            server = MatchServer(args.move_time, max_games=args.games, record_path=args.record, on_result=report)
+            address = await server.start(args.host, args.port, args.unix)
+            print(f"Serving on {address}", flush=True)
+            await server.serve_forever()
+
+        asyncio.run(serve_main())
+    else:
+        processes = [multiprocessing.Process(target=_client_process,
+                                             args=(args.agent, args.host, args.port, args.unix, args.games, args.clock))
+                     for _ in range(args.clients)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# tables.py
+import os
+import random
+from array import array
+
+# 小棋盘只有 3^9 = 19683 种状态，导入时一次性预计算所有查询结果
+# 编码：code = sum(v * 3^cell)，空格为 0，X 为 1，O 为 2
+
+MARK_VALUE = {' ': 0, 'X': 1, 'O': 2}
+POW3 = [3 ** i for i in range(9)]
+NUM_STATES = 3 ** 9
+
+WIN_LINES = [(0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6), (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6)]
+
+# code -> 赢家 ' '、'X' 或 'O'
+WINNER = []
+# code -> 是否已满
+FULL = []
+# code -> 空格位掩码（第 cell 位为 1 表示空）
+EMPTY_MASK = []
+# code -> 空格列表
+LEGAL_CELLS = []
+# code -> (X 的威胁数, O 的威胁数)，威胁指两子一空的线
+THREATS = []
+
+def board_code(board):
+    code = 0
+    for cell, mark in enumerate(board):
+        code += MARK_VALUE[mark] * POW3[cell]
+    return code
+
+def _build():
+    marks = (' ', 'X', 'O')
+    for code in range(NUM_STATES):
+        cells = []
+        rest = code
+        for _ in range(9):
+            cells.append(marks[rest % 3])
+            rest //= 3
+        winner = ' '
+        threats_x = threats_o = 0
+        for a, b, c in WIN_LINES:
+            line = (cells[a], cells[b], cells[c])
+            if line[0] == line[1] == line[2] != ' ':
+                winner = line[0]
+            elif ' ' in line and line.count(' ') == 1:
+                if line.count('X') == 2:
+                    threats_x += 1
+                elif line.count('O') == 2:
+                    threats_o += 1
+        empty = [cell for cell in range(9) if cells[cell] == ' ']
+        WINNER.append(winner)
+        FULL.append(not empty)
+        EMPTY_MASK.append(sum(1 << cell for cell in empty))
+        LEGAL_CELLS.append(tuple(empty))
+        THREATS.append((threats_x, threats_o))
+
+# Zobrist 哈希键：用固定种子生成，不同进程、不同次运行得到相同的局面哈希
+# ZOBRIST[v - 1][board * 9 + cell] 对应 v 方（1 为 X，2 为 O）在该格落子
+_zobrist_rng = random.Random(0x9B0A4D)
+ZOBRIST = [[_zobrist_rng.getrandbits(64) for _ in range(81)] for _ in range(2)]
+# 当前可落子的小棋盘（索引 + 1，0 表示任意棋盘）和轮到 O 走
+ZOBRIST_ACTIVE = [_zobrist_rng.getrandbits(64) for _ in range(10)]
+ZOBRIST_SIDE = _zobrist_rng.getrandbits(64)
+
+# 构建约需 0.1 秒，结果以紧凑的二进制缓存在 __pycache__ 中，之后的启动直接读取
+TABLES_VERSION = 1
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '__pycache__', f'tables.v{TABLES_VERSION}.bin')
+_MARKS = (' ', 'X', 'O')
+
+def _fill(winner, empty_mask, threats_x, threats_o):
+    cells_by_mask = [tuple(cell for cell in range(9) if mask >> cell & 1) for mask in range(512)]
+    WINNER.extend([_MARKS[w] for w in winner])
+    EMPTY_MASK.extend(empty_mask)
+    FULL.extend([mask == 0 for mask in empty_mask])
+    LEGAL_CELLS.extend([cells_by_mask[mask] for mask in empty_mask])
+    THREATS.extend(zip(threats_x, threats_o))
+
+def _load():
+    try:
+        with open(CACHE_PATH, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return False
+    if len(data) != NUM_STATES * 5:
+        return False
+    n = NUM_STATES
+    empty_mask = array('H')
+    empty_mask.frombytes(data[3 * n:])
+    _fill(data[:n], empty_mask, data[n:2 * n], data[2 * n:3 * n])
+    return True
+
+def _save():
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        tmp_path = f'{CACHE_PATH}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(bytes(MARK_VALUE[w] for w in WINNER))
+            f.write(bytes(t[0] for t in THREATS))
+            f.write(bytes(t[1] for t in THREATS))
+            f.write(array('H', EMPTY_MASK).tobytes())
+        os.replace(tmp_path, CACHE_PATH)
+    except OSError:
+        pass
+
+if not _load():
+    _build()
+    _save()
@@ -0,0 +1,57 @@
+# timecontrol.py
+
+# 整局计时：总时间加每步加时，根据局面为每一步分配思考时间
+class TimeControl:
+    def __init__(self, total=60, increment=0, min_moves_left=8, max_extension=3.0, safety=0.05):
+        self.total = total
+        self.increment = increment
+        self.min_moves_left = min_moves_left
+        self.max_extension = max_extension
+        self.safety = safety
+        self.new_game()
+
+    def new_game(self):
+        self.remaining = self.total
+        self.moves_played = 0
+        self.flagged = False
+
+    def budget(self, game, moves):
+        # 返回 (计划用时, 最长用时)；只有一个合法落子时直接走
+        if len(moves) <= 1:
+            return 0.0, 0.0
+        filled = sum(cell != ' ' for board in game.boards for cell in board)
+        # 一局通常在 50~60 手内结束，估算自己还要走多少步
+        moves_left = max(self.min_moves_left, (60 - filled) / 2)
+        base = (self.remaining - self.safety) / moves_left + self.increment * 0.8
+
+        # 开局和被限定在单个小棋盘时分歧较小，中局可以自由选择棋盘时最关键
+        if filled < 6:
+            base *= 0.6
+        elif game.current_board_index == -1:
+            base *= 1.3
+        if len(moves) <= 3:
+            base *= 0.5
+
+        limit = max(0.0, self.remaining - self.safety)
+        maximum = min(base * self.max_extension, limit / 2)
+        base = min(base, maximum)
+        return max(0.0, base), max(0.0, maximum)
+
+    # 搜索不稳定时（最佳着法变化、访问次数差距小）延长用时
+    def extend(self, base, maximum, instability):
+        return min(maximum, base * (1 + (self.max_extension - 1) * instability))
+
+    def consume(self, elapsed):
+        self.remaining -= elapsed
+        if self.remaining < 0:
+            self.flagged = True
+        self.remaining += self.increment
+        self.moves_played += 1
+
+# 解析 "TOTAL+INC" 形式的时钟，例如 "60+0.5"；只给总时间时没有加时
+def parse_clock(text):
+    total, _, increment = str(text).partition('+')
+    total, increment = float(total), float(increment or 0)
+    if total <= 0 or increment < 0:
+        raise ValueError(f"Invalid clock: {text}")
+    return total, increment
@@ -0,0 +1,208 @@
+# tournament_stats.py
+import json
+import math
+import os
+
+# 长时间比赛的流式统计：每局结束就更新累计数据，定期把状态写到磁盘，
+# 中断后可以从检查点继续，并随时用已有结果重新生成报告
+
+CHECKPOINT_VERSION = 1
+
+# 走子耗时直方图：对数分桶，相邻桶边界相差 GROWTH 倍，
+# 内存与对局数无关，分位数的相对误差不超过 GROWTH - 1
+class LatencyHistogram:
+    MIN_LATENCY = 1e-4
+    GROWTH = 1.05
+    BUCKETS = 400
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _bucket(self, seconds):
+        if seconds <= self.MIN_LATENCY:
+            return 0
+        index = int(math.log(seconds / self.MIN_LATENCY) / math.log(self.GROWTH)) + 1
+        return min(index, self.BUCKETS - 1)
+
+    def add(self, seconds):
+        bucket = self._bucket(seconds)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        # 返回分位数所在桶的上界（不超过实际最大值）
+        if not self.count:
+            return None
+        rank = math.ceil(q / 100 * self.count)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self.MIN_LATENCY * self.GROWTH ** bucket, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {'counts': {str(b): n for b, n in sorted(self.counts.items())},
+                'count': self.count, 'total': self.total, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.counts = {int(b): n for b, n in data['counts'].items()}
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.max = data['max']
+        return histogram
+
+def _new_agent():
+    return {'total_time': 0.0, 'total_moves': 0, 'total_cpu': 0.0, 'wins': 0, 'losses': 0, 'draws': 0}
+
+class TournamentStats:
+    def __init__(self, checkpoint_path=None, checkpoint_every=10):
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.agents = {}
+        self.latency = {}
+        # {(a, b): {'wins': a 胜, 'losses': b 胜, 'draws': 和, 'completed': 已完成的局号}}
+        self.pairs = {}
+        self.games = 0
+        # 比赛的随机种子，与检查点一起保存，续跑时用同一个种子才能重现剩下的对局
+        self.seed = None
+        self._unsaved = 0
+
+    def _agent(self, name):
+        if name not in self.agents:
+            self.agents[name] = _new_agent()
+            self.latency[name] = LatencyHistogram()
+        return self.agents[name]
+
+    def pair(self, player_a, player_b):
+        key = (player_a, player_b)
+        if key not in self.pairs:
+            self.pairs[key] = {'wins': 0, 'losses': 0, 'draws': 0, 'completed': set()}
+        return self.pairs[key]
+
+    def completed(self, player_a, player_b):
+        return self.pair(player_a, player_b)['completed']
+
+    # pair 为 (a, b)，index 为该组对局中的局号；times/cpu 是按走子顺序排列的每步数据，X 先走
+    # 已经记录过的局会被忽略，返回是否为新结果
+    def add_game(self, pair, index, x_name, winner, times, cpu=None):
+        player_a, player_b = pair
+        match = self.pair(player_a, player_b)
+        if index in match['completed']:
+            return False
+        match['completed'].add(index)
+        o_name = player_b if x_name == player_a else player_a
+        for ply, seconds in enumerate(times):
+            name = x_name if ply % 2 == 0 else o_name
+            stats = self._agent(name)
+            stats['total_time'] += seconds
+            stats['total_moves'] += 1
+            if cpu is not None:
+                stats['total_cpu'] += cpu[ply]
+            self.latency[name].add(seconds)
+
+        a_stats, b_stats = self._agent(player_a), self._agent(player_b)
+        if winner == 'Draw':
+            match['draws'] += 1
+            a_stats['draws'] += 1
+            b_stats['draws'] += 1
+        elif (winner == 'X') == (x_name == player_a):
+            match['wins'] += 1
+            a_stats['wins'] += 1
+            b_stats['losses'] += 1
+        else:
+            match['losses'] += 1
+            a_stats['losses'] += 1
+            b_stats['wins'] += 1
+
+        self.games += 1
+        self._unsaved += 1
+        if self.checkpoint_path and self._unsaved >= self.checkpoint_every:
+            self.checkpoint()
+        return True
+
+    # 与 main.plot_* 使用的 all_stats 格式兼容，另外附带 p50/p95/p99 走子耗时
+    def all_stats(self):
+        result = {}
+        for name, totals in self.agents.items():
+            stats = dict(totals)
+            moves = stats['total_moves']
+            stats['avg_time'] = stats['total_time'] / moves if moves else 0
+            stats['avg_cpu'] = stats['total_cpu'] / moves if moves else 0
+            games = stats['wins'] + stats['losses'] + stats['draws']
+            stats['win_rate'] = stats['wins'] / games if games else 0
+            stats['loss_rate'] = stats['losses'] / games if games else 0
+            stats['draw_rate'] = stats['draws'] / games if games else 0
+            for q in (50, 95, 99):
+                stats[f'p{q}'] = self.latency[name].percentile(q) or 0
+            result[name] = stats
+        return result
+
+    def pair_results(self):
+        return {key: (match['wins'], match['losses'], match['draws']) for key, match in self.pairs.items()
+                if match['completed']}
+
+    def to_dict(self):
+        return {
+            'version': CHECKPOINT_VERSION,
+            'games': self.games,
+            'seed': self.seed,
+            'agents': self.agents,
+            'latency': {name: histogram.to_dict() for name, histogram in self.latency.items()},
+            'pairs': [{'players': list(key), 'wins': match['wins'], 'losses': match['losses'],
+                       'draws': match['draws'], 'completed': sorted(match['completed'])}
+                      for key, match in self.pairs.items()],
+        }
+
+    # 先写临时文件再替换，写到一半崩溃也不会损坏原有检查点
+    def checkpoint(self, path=None):
+        path = path or self.checkpoint_path
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._unsaved = 0
+
+    @classmethod
+    def load(cls, path, checkpoint_every=10):
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"{path} is not a version {CHECKPOINT_VERSION} tournament checkpoint")
+        stats = cls(path, checkpoint_every)
+        stats.games = data['games']
+        stats.seed = data.get('seed')
+        stats.agents = data['agents']
+        stats.latency = {name: LatencyHistogram.from_dict(h) for name, h in data['latency'].items()}
+        for entry in data['pairs']:
+            stats.pairs[tuple(entry['players'])] = {'wins': entry['wins'], 'losses': entry['losses'],
+                                                    'draws': entry['draws'], 'completed': set(entry['completed'])}
+        return stats
+
+    # 检查点存在时从中恢复，否则新建
+    @classmethod
+    def resume(cls, path, checkpoint_every=10):
+        if os.path.exists(path):
+            return cls.load(path, checkpoint_every)
+        return cls(path, checkpoint_every)
+
+    def format_report(self):
+        lines = [f"Total games played: {self.games}"]
+        for name, stats in self.all_stats().items():
+            lines.append(f"\n{name}:")
+            lines.append(f"  Wins: {stats['wins']} ({stats['win_rate']:.2%})")
+            lines.append(f"  Losses: {stats['losses']} ({stats['loss_rate']:.2%})")
+            lines.append(f"  Draws: {stats['draws']} ({stats['draw_rate']:.2%})")
+            lines.append(f"  Average move time: {stats['avg_time']:.4f} seconds")
+            lines.append(f"  Move time p50/p95/p99: {stats['p50']:.4f} / {stats['p95']:.4f} / {stats['p99']:.4f} seconds")
+            lines.append(f"  Average CPU usage: {stats['avg_cpu']:.2f}%")
+        return '\n'.join(lines)
@@ -0,0 +1,76 @@
+# ttable.py
+import mmap
+import os
+import struct
+
+# 存放在内存映射文件中的置换表：同一台机器上的所有进程共享，下次运行继续使用
+# 每项 16 字节 <QQ：check = key ^ data 和 data
+# 读取时用 check ^ data == key 校验，两个进程同时写同一项造成的半写数据会被当作未命中，
+# 所以不需要加锁（Hyatt 的 lockless hashing）
+# data 的布局：depth(8 位) | bound(8 位) | score + 32768(16 位) | move(8 位，255 表示无)
+MAGIC = b'NBTT\x01\x00\x00\x00'
+HEADER = struct.Struct('<8sQ')
+ENTRY = struct.Struct('<QQ')
+MASK64 = (1 << 64) - 1
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+NO_MOVE = 255
+
+class SharedTranspositionTable:
+    def __init__(self, path, entries=1 << 20):
+        if entries & (entries - 1):
+            raise ValueError("entries must be a power of two")
+        self.path = path
+        self.entries = entries
+        size = HEADER.size + entries * ENTRY.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            current = os.fstat(fd).st_size
+            if current == 0:
+                # 多个进程同时创建时得到的内容相同，不会冲突
+                os.ftruncate(fd, size)
+                os.pwrite(fd, HEADER.pack(MAGIC, entries), 0)
+            elif current != size:
+                raise ValueError(f"{path} holds a table of a different size")
+            self._map = mmap.mmap(fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        finally:
+            os.close(fd)
+        magic, stored_entries = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or stored_entries != entries:
+            self._map.close()
+            raise ValueError(f"{path} is not a transposition table with {entries} entries")
+        # 每个桶两项：第一项优先保留深度大的结果，第二项总是覆盖
+        self._bucket_mask = entries // 2 - 1
+
+    def _slot(self, key):
+        return HEADER.size + (key & self._bucket_mask) * 2 * ENTRY.size
+
+    def probe(self, key):
+        # 返回 (depth, bound, score, move) 或 None
+        pos = self._slot(key)
+        for offset in (pos, pos + ENTRY.size):
+            check, data = ENTRY.unpack_from(self._map, offset)
+            if check ^ data == key and data:
+                move = data >> 32 & 0xFF
+                return (data & 0xFF, data >> 8 & 0xFF, (data >> 16 & 0xFFFF) - 32768,
+                        None if move == NO_MOVE else divmod(move, 9))
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        move_code = NO_MOVE if move is None else move[0] * 9 + move[1]
+        data = min(depth, 255) | bound << 8 | (int(score) + 32768) << 16 | move_code << 32
+        pos = self._slot(key)
+        check, old = ENTRY.unpack_from(self._map, pos)
+        if check ^ old != key and old and depth < (old & 0xFF):
+            # 深度优先项里是更深的其他局面，写到覆盖项
+            pos += ENTRY.size
+        ENTRY.pack_into(self._map, pos, (key ^ data) & MASK64, data)
+
+    def clear(self):
+        self._map[HEADER.size:] = bytes(len(self._map) - HEADER.size)
+
+    def close(self):
+        self._map.close()